@@ -0,0 +1,142 @@
+# Compare the cache codecs in nookipedia.serialization on payloads shaped like real Cargo entries:
+# encode/decode time, and entry size before and after the cache layer's zlib compression.
+# Run from the repository root (it imports the app, so config.ini must exist):
+#   python benchmarks/cache_codecs.py [--repeat 5]
+# msgpack is only measured if it is installed.
+import argparse
+import os
+import random
+import sys
+import time
+import zlib
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from nookipedia.config import CACHE_COMPRESS_LEVEL  # noqa: E402
+from nookipedia.serialization import CODECS  # noqa: E402
+
+COLORS = ["Aqua", "Beige", "Black", "Blue", "Brown", "Colorful", "Gray", "Green", "Orange", "Pink"]
+
+
+def image_url(name, i):
+    return "https://dodo.ac/np/images/{}/{:02x}/{}.png".format(i % 16, i % 256, name)
+
+
+def villager_rows(count=400):
+    # villager table: one wide row per villager, mostly short strings
+    rows = []
+    for i in range(count):
+        name = "Villager {}".format(i)
+        row = {
+            "name": name,
+            "url": "https://nookipedia.com/wiki/Villager_{}".format(i),
+            "image_url": image_url(name, i),
+            "species": random.choice(["Cat", "Dog", "Duck", "Frog", "Wolf"]),
+            "personality": random.choice(["Lazy", "Jock", "Cranky", "Smug", "Normal", "Peppy"]),
+            "gender": random.choice(["Male", "Female"]),
+            "birthday_month": str(i % 12 + 1),
+            "birthday_day": str(i % 28 + 1),
+            "sign": "Aries",
+            "quote": "Quote number {} goes here.".format(i),
+            "phrase": "phrase{}".format(i),
+        }
+        for game in ["dnm", "ac", "e_plus", "ww", "cf", "nl", "wa", "nh", "film", "hhd", "pc"]:
+            row["appearances_" + game] = random.choice(["0", "1"])
+        for field in ["clothing", "umbrella", "song", "wallpaper", "flooring", "fav_styles"]:
+            row["nh_" + field] = "{} {}".format(field, i % 50)
+        rows.append(row)
+    return rows
+
+
+def variation_rows(count=14000):
+    # nh_furniture_variation: many narrow rows
+    return [
+        {
+            "name": "Furniture {}".format(i // 8),
+            "variation": "Variation {}".format(i % 8),
+            "pattern": "Pattern {}".format(i % 3),
+            "image_url": image_url("Furniture_{}".format(i), i),
+            "color1": random.choice(COLORS),
+            "color2": random.choice(COLORS),
+        }
+        for i in range(count)
+    ]
+
+
+def critter_rows(count=80):
+    # nh_fish/nh_bug/nh_sea_creature: a few rows with per-month availability columns
+    rows = []
+    for i in range(count):
+        name = "Critter {}".format(i)
+        row = {
+            "name": name,
+            "number": str(i + 1),
+            "url": "https://nookipedia.com/wiki/Critter_{}".format(i),
+            "image_url": image_url(name, i),
+            "render_url": image_url(name + "_render", i),
+            "location": "River",
+            "shadow_size": "Medium",
+            "rarity": "Common",
+            "total_catch": str(i * 5),
+            "sell_nook": str(i * 100),
+            "sell_cj": str(i * 150),
+            "tank_width": "1",
+            "tank_length": "1",
+        }
+        for hemisphere in ["n", "s"]:
+            for month in range(1, 13):
+                row["{}_m{}".format(hemisphere, month)] = random.choice(
+                    ["", "All day", "4 PM – 9 AM"]
+                )
+                row["{}_m{}_time".format(hemisphere, month)] = random.choice(["", "All day"])
+            row["{}_availability_array".format(hemisphere)] = "1,2,3,4,5,6,7,8,9,10,11,12"
+        rows.append(row)
+    return rows
+
+
+def timed(fn, arg, repeat):
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn(arg)
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    random.seed(0)
+    payloads = [
+        ("villagers", villager_rows()),
+        ("furniture variations", variation_rows()),
+        ("critters", critter_rows()),
+    ]
+    print(
+        "{:<22} {:<8} {:>10} {:>10} {:>11} {:>11}".format(
+            "payload", "codec", "encode", "decode", "raw bytes", "zlib bytes"
+        )
+    )
+    for payload_name, rows in payloads:
+        entry = {"expires": time.time(), "data": rows}
+        for codec_name, codec in CODECS.items():
+            encode_seconds, data = timed(codec.encode, entry, args.repeat)
+            decode_seconds, decoded = timed(codec.decode, data, args.repeat)
+            assert decoded == entry
+            print(
+                "{:<22} {:<8} {:>9.2f}ms {:>9.2f}ms {:>11} {:>11}".format(
+                    payload_name,
+                    codec_name,
+                    encode_seconds * 1000,
+                    decode_seconds * 1000,
+                    len(data),
+                    len(zlib.compress(data, CACHE_COMPRESS_LEVEL)),
+                )
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+# Compare Cargo row de-duplication: the old list scan against nookipedia.utility.dedupe_rows.
+# Run from the repository root (it imports the app, so config.ini must exist):
+#   python benchmarks/dedupe_rows.py [--sizes 1000 5000 14000] [--duplicates 0.05]
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from nookipedia.utility import dedupe_rows  # noqa: E402
+
+COLORS = ["Aqua", "Beige", "Black", "Blue", "Brown", "Colorful", "Gray", "Green", "Orange", "Pink"]
+
+
+def variation_rows(count, duplicates):
+    # Rows shaped like nh_furniture_variation results (six string fields), with some repeats
+    rows = []
+    for i in range(count):
+        if rows and random.random() < duplicates:
+            rows.append(dict(random.choice(rows)))
+            continue
+        rows.append(
+            {
+                "name": "Furniture {}".format(i // 8),
+                "variation": "Variation {}".format(i % 8),
+                "pattern": "Pattern {}".format(i % 3),
+                "image_url": "https://dodo.ac/np/images/{}/{:02x}/Furniture_{}.png".format(
+                    i % 16, i % 256, i
+                ),
+                "color1": random.choice(COLORS),
+                "color2": random.choice(COLORS),
+            }
+        )
+    return rows
+
+
+def list_scan(rows):
+    # What call_cargo used to do
+    results = []
+    for item in rows:
+        if item not in results:
+            results.append(item)
+    return results
+
+
+def timed(fn, rows):
+    started = time.perf_counter()
+    result = fn(rows)
+    return time.perf_counter() - started, result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 5000, 14000])
+    parser.add_argument("--duplicates", type=float, default=0.05)
+    args = parser.parse_args()
+
+    random.seed(0)
+    print("{:>8} {:>12} {:>12} {:>9}".format("rows", "list scan", "fingerprint", "speedup"))
+    for size in args.sizes:
+        rows = variation_rows(size, args.duplicates)
+        old_seconds, old_result = timed(list_scan, rows)
+        new_seconds, new_result = timed(dedupe_rows, rows)
+        assert old_result == new_result
+        print(
+            "{:>8} {:>11.3f}s {:>11.3f}s {:>8.0f}x".format(
+                size, old_seconds, new_seconds, old_seconds / new_seconds
+            )
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,11 @@
-from flask import Flask
+import time
+
+from flask import Flask, g, request
 from flask_cors import CORS
 
-from nookipedia.config import config
+from nookipedia.config import config, ENDPOINT_DEADLINES, REQUEST_DEADLINE
 from nookipedia.dashboard import configure_dashboard
-from nookipedia import api, db, errors
+from nookipedia import api, db, errors, upstream
 from nookipedia.cache import cache, mc_client
 
 
@@ -13,6 +15,25 @@ app.config["JSON_SORT_KEYS"] = False  # Prevent from automatically sorting JSON
 app.config["SECRET_KEY"] = config.get("APP", "SECRET_KEY")
 
 
+@app.before_request
+def set_upstream_priority():
+    # Routes naming a single item (e.g. /nh/fish/<fish>) get ahead of list pulls in the bulkhead
+    g.upstream_priority = upstream.PRIORITY_ITEM if request.view_args else upstream.PRIORITY_BULK
+
+
+@app.before_request
+def set_request_deadline():
+    # Upstream calls (pages, retries, thumbnails, logins) give up once this passes
+    g.deadline = time.monotonic() + ENDPOINT_DEADLINES.get(request.endpoint, REQUEST_DEADLINE)
+
+
+@app.after_request
+def apply_response_headers(response):
+    for name, value in g.get("response_headers", {}).items():
+        response.headers[name] = value
+    return response
+
+
 @app.teardown_appcontext
 def teardown(exception):
     db.close_connection(exception)
@@ -20,22 +41,18 @@ def teardown(exception):
 
 cache.init_app(app)
 
-# Give each uWSGI worker its own memcached connection
+# Give each uWSGI worker its own memcached and HTTP connections
 try:
     from uwsgidecorators import postfork
 
     @postfork
     def reconnect_cache():
         mc_client.disconnect_all()
+        upstream.sessions.reset()
 
 except ImportError:
     pass  # Not running under uWSGI (e.g. local dev)
 
-try:
-    cache.set("session", None)
-except Exception:
-    pass
-
 configure_dashboard(app)
 
 app.register_error_handler(400, errors.error_bad_request)
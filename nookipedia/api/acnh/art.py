@@ -2,7 +2,7 @@ import requests
 from flask import abort, jsonify, request, Blueprint
 
 from nookipedia.config import DB_KEYS, ART_LIMIT
-from nookipedia.middlewares import authorize
+from nookipedia.middlewares import authorize, cache_response
 from nookipedia.cargo import call_cargo, get_art_list
 from nookipedia.errors import error_response
 from nookipedia.models import format_art
@@ -12,6 +12,7 @@ router = Blueprint("art", __name__)
 
 
 @router.route("/nh/art/<string:art>", methods=["GET"])
+@cache_response(DB_KEYS)
 def get_nh_art(art):
     authorize(DB_KEYS, request)
 
@@ -63,6 +64,7 @@ def get_nh_art(art):
 
 
 @router.route("/nh/art", methods=["GET"])
+@cache_response(DB_KEYS)
 def get_nh_art_all():
     authorize(DB_KEYS, request)
 
@@ -2,7 +2,7 @@ import requests
 from flask import abort, jsonify, request, Blueprint
 
 from nookipedia.config import DB_KEYS, BUG_LIMIT
-from nookipedia.middlewares import authorize
+from nookipedia.middlewares import authorize, cache_response
 from nookipedia.cargo import call_cargo, get_critter_list
 from nookipedia.errors import error_response
 from nookipedia.models import exact_version, months_to_array, format_critters
@@ -14,6 +14,7 @@ router = Blueprint("bugs", __name__)
 
 # All New Horizons bugs
 @router.route("/nh/bugs", methods=["GET"])
+@cache_response(DB_KEYS)
 def get_nh_bug_all():
     authorize(DB_KEYS, request)
 
@@ -127,6 +128,7 @@ def get_nh_bug_all():
 
 # Specific New Horizons bug
 @router.route("/nh/bugs/<string:bug>", methods=["GET"])
+@cache_response(DB_KEYS)
 def get_nh_bug(bug):
     authorize(DB_KEYS, request)
 
@@ -2,17 +2,23 @@ import requests
 from flask import abort, jsonify, request, Blueprint
 
 from nookipedia.config import DB_KEYS, CLOTHING_LIMIT, CLOTHING_VARIATION_LIMIT
-from nookipedia.middlewares import authorize
-from nookipedia.cargo import call_cargo, get_clothing_list, get_variation_list
+from nookipedia.middlewares import authorize, cache_response
+from nookipedia.cargo import get_clothing_list, get_variation_list
+from nookipedia.cargo_async import call_cargo_batch, run_concurrent
 from nookipedia.errors import error_response
-from nookipedia.models import format_clothing, stitch_variation, stitch_variation_list
+from nookipedia.models import (
+    format_clothing,
+    stitch_variation,
+    stitch_variation_list,
+    stitch_variation_names,
+)
 from nookipedia.utility import generate_fields
 
-
 router = Blueprint("clothing", __name__)
 
 
 @router.route("/nh/clothing/<string:clothing>", methods=["GET"])
+@cache_response(DB_KEYS)
 def get_nh_clothing(clothing):
     authorize(DB_KEYS, request)
 
@@ -70,7 +76,7 @@ def get_nh_clothing(clothing):
         "limit": variation_limit,
     }
 
-    cargo_results = call_cargo(clothing_params, request.args)
+    cargo_results, variations = call_cargo_batch([clothing_params, variation_params], request.args)
     if len(cargo_results) == 0:
         abort(
             404,
@@ -81,22 +87,14 @@ def get_nh_clothing(clothing):
         )
     else:
         piece = format_clothing(cargo_results[0])
-        variations = call_cargo(variation_params, request.args)
         return jsonify(stitch_variation(piece, variations))
 
 
 @router.route("/nh/clothing", methods=["GET"])
+@cache_response(DB_KEYS)
 def get_nh_clothing_all():
     authorize(DB_KEYS, request)
 
-    if "thumbsize" in request.args:
-        abort(
-            400,
-            description=error_response(
-                "Invalid arguments", "Cannot have thumbsize in a group item request"
-            ),
-        )
-
     clothing_limit = CLOTHING_LIMIT
     clothing_tables = "nh_clothing"
     clothing_fields = generate_fields(
@@ -131,13 +129,14 @@ def get_nh_clothing_all():
     variation_fields = generate_fields("en_name=name", "variation", "image_url", "color1", "color2")
     variation_orderby = "variation_number"
 
-    clothing_list = get_clothing_list(clothing_limit, clothing_tables, clothing_fields)
-    variation_list = get_variation_list(
-        variation_limit, variation_tables, variation_fields, variation_orderby
+    clothing_list, variation_list = run_concurrent(
+        lambda: get_clothing_list(clothing_limit, clothing_tables, clothing_fields),
+        lambda: get_variation_list(
+            variation_limit, variation_tables, variation_fields, variation_orderby
+        ),
     )
-    stitched = stitch_variation_list(clothing_list, variation_list)
-
+    # With excludedetails the lists above only hold names (see nookipedia.cargo.names_only)
     if request.args.get("excludedetails") == "true":
-        return jsonify([_["name"] for _ in stitched])
+        return jsonify(stitch_variation_names(clothing_list, variation_list))
     else:
-        return jsonify(stitched)
+        return jsonify(stitch_variation_list(clothing_list, variation_list))
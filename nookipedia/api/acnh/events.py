@@ -1,7 +1,7 @@
 from flask import request, Blueprint
 
 from nookipedia.config import DB_KEYS, EVENT_LIMIT
-from nookipedia.middlewares import authorize
+from nookipedia.middlewares import authorize, cache_response
 from nookipedia.cargo import get_event_list
 from nookipedia.utility import generate_fields
 
@@ -10,6 +10,7 @@ router = Blueprint("events", __name__)
 
 
 @router.route("/nh/events", methods=["GET"])
+@cache_response(DB_KEYS)
 def get_nh_event_all():
     authorize(DB_KEYS, request)
 
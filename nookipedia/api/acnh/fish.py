@@ -2,7 +2,7 @@ import requests
 from flask import abort, jsonify, request, Blueprint
 
 from nookipedia.config import DB_KEYS, FISH_LIMIT
-from nookipedia.middlewares import authorize
+from nookipedia.middlewares import authorize, cache_response
 from nookipedia.cargo import call_cargo, get_critter_list
 from nookipedia.errors import error_response
 from nookipedia.models import exact_version, months_to_array, format_critters
@@ -14,6 +14,7 @@ router = Blueprint("fish", __name__)
 
 # All New Horizons fish
 @router.route("/nh/fish", methods=["GET"])
+@cache_response(DB_KEYS)
 def get_nh_fish_all():
     authorize(DB_KEYS, request)
 
@@ -128,6 +129,7 @@ def get_nh_fish_all():
 
 # Specific New Horizons fish
 @router.route("/nh/fish/<string:fish>", methods=["GET"])
+@cache_response(DB_KEYS)
 def get_nh_fish(fish):
     authorize(DB_KEYS, request)
     fish = requests.utils.unquote(fish).replace("_", " ")
@@ -2,12 +2,13 @@ import requests
 from flask import abort, jsonify, request, Blueprint
 
 from nookipedia.config import DB_KEYS, FOSSIL_GROUP_LIMIT, FOSSIL_INDIVIDUAL_LIMIT
-from nookipedia.middlewares import authorize
+from nookipedia.middlewares import authorize, cache_response
 from nookipedia.cargo import (
     call_cargo,
     get_fossil_group_list,
     get_fossil_list,
 )
+from nookipedia.cargo_async import run_concurrent
 from nookipedia.errors import error_response
 from nookipedia.models import (
     format_fossil,
@@ -20,6 +21,7 @@ router = Blueprint("fossils", __name__, url_prefix="/nh/fossils")
 
 
 @router.route("/groups", methods=["GET"])
+@cache_response(DB_KEYS)
 def get_nh_fossil_group_all():
     authorize(DB_KEYS, request)
 
@@ -35,6 +37,7 @@ def get_nh_fossil_group_all():
 
 
 @router.route("/individuals", methods=["GET"])
+@cache_response(DB_KEYS)
 def get_nh_fossil_individual_all():
     authorize(DB_KEYS, request)
 
@@ -62,6 +65,7 @@ def get_nh_fossil_individual_all():
 
 
 @router.route("/all", methods=["GET"])
+@cache_response(DB_KEYS)
 def get_nh_fossil_all_all():  # What a good name
     authorize(DB_KEYS, request)
 
@@ -84,8 +88,10 @@ def get_nh_fossil_all_all():  # What a good name
         "length",
     )
 
-    groups = get_fossil_group_list(group_limit, group_tables, group_fields)
-    fossils = get_fossil_list(fossil_limit, fossil_tables, fossil_fields)
+    groups, fossils = run_concurrent(
+        lambda: get_fossil_group_list(group_limit, group_tables, group_fields),
+        lambda: get_fossil_list(fossil_limit, fossil_tables, fossil_fields),
+    )
 
     stitched = stitch_fossil_group_list(groups, fossils)
 
@@ -100,6 +106,7 @@ def get_nh_fossil_all_all():  # What a good name
 
 
 @router.route("/groups/<string:name>", methods=["GET"])
+@cache_response(DB_KEYS)
 def get_nh_fossil_group(name):
     authorize(DB_KEYS, request)
 
@@ -134,6 +141,7 @@ def get_nh_fossil_group(name):
 
 
 @router.route("/individuals/<string:name>", methods=["GET"])
+@cache_response(DB_KEYS)
 def get_nh_fossil_individual(name):
     authorize(DB_KEYS, request)
 
@@ -181,6 +189,7 @@ def get_nh_fossil_individual(name):
 
 
 @router.route("/all/<string:name>", methods=["GET"])
+@cache_response(DB_KEYS)
 def get_nh_fossil_all(name):
     authorize(DB_KEYS, request)
 
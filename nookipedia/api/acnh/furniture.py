@@ -2,17 +2,23 @@ import requests
 from flask import abort, jsonify, request, Blueprint
 
 from nookipedia.config import DB_KEYS, FURNITURE_LIMIT, FURNITURE_VARIATION_LIMIT
-from nookipedia.middlewares import authorize
-from nookipedia.cargo import call_cargo, get_furniture_list, get_furniture_variation_list
+from nookipedia.middlewares import authorize, cache_response
+from nookipedia.cargo import get_furniture_list, get_furniture_variation_list
+from nookipedia.cargo_async import call_cargo_batch, run_concurrent
 from nookipedia.errors import error_response
-from nookipedia.models import format_furniture, stitch_variation, stitch_variation_list
+from nookipedia.models import (
+    format_furniture,
+    stitch_variation,
+    stitch_variation_list,
+    stitch_variation_names,
+)
 from nookipedia.utility import generate_fields
 
-
 router = Blueprint("furniture", __name__)
 
 
 @router.route("/nh/furniture/<string:furniture>", methods=["GET"])
+@cache_response(DB_KEYS)
 def get_nh_furniture(furniture):
     authorize(DB_KEYS, request)
 
@@ -85,7 +91,7 @@ def get_nh_furniture(furniture):
         "limit": variation_limit,
     }
 
-    cargo_results = call_cargo(furniture_params, request.args)
+    cargo_results, variations = call_cargo_batch([furniture_params, variation_params], request.args)
     if len(cargo_results) == 0:
         abort(
             404,
@@ -96,22 +102,14 @@ def get_nh_furniture(furniture):
         )
     else:
         piece = format_furniture(cargo_results[0])
-        variations = call_cargo(variation_params, request.args)
         return jsonify(stitch_variation(piece, variations))
 
 
 @router.route("/nh/furniture", methods=["GET"])
+@cache_response(DB_KEYS)
 def get_nh_furniture_all():
     authorize(DB_KEYS, request)
 
-    if "thumbsize" in request.args:
-        abort(
-            400,
-            description=error_response(
-                "Invalid arguments", "Cannot have thumbsize in a group item request"
-            ),
-        )
-
     furniture_limit = FURNITURE_LIMIT
     furniture_tables = "nh_furniture"
     furniture_fields = generate_fields(
@@ -161,13 +159,14 @@ def get_nh_furniture_all():
     )
     variation_orderby = "variation_number,pattern_number"
 
-    furniture_list = get_furniture_list(furniture_limit, furniture_tables, furniture_fields)
-    variation_list = get_furniture_variation_list(
-        variation_limit, variation_tables, variation_fields, variation_orderby
+    furniture_list, variation_list = run_concurrent(
+        lambda: get_furniture_list(furniture_limit, furniture_tables, furniture_fields),
+        lambda: get_furniture_variation_list(
+            variation_limit, variation_tables, variation_fields, variation_orderby
+        ),
     )
-    stitched = stitch_variation_list(furniture_list, variation_list)
-
+    # With excludedetails the lists above only hold names (see nookipedia.cargo.names_only)
     if request.args.get("excludedetails") == "true":
-        return jsonify([_["name"] for _ in stitched])
+        return jsonify(stitch_variation_names(furniture_list, variation_list))
     else:
-        return jsonify(stitched)
+        return jsonify(stitch_variation_list(furniture_list, variation_list))
@@ -2,7 +2,7 @@ import requests
 from flask import abort, jsonify, request, Blueprint
 
 from nookipedia.config import DB_KEYS, INTERIOR_LIMIT
-from nookipedia.middlewares import authorize
+from nookipedia.middlewares import authorize, cache_response
 from nookipedia.cargo import call_cargo, get_interior_list
 from nookipedia.errors import error_response
 from nookipedia.models import format_interior
@@ -13,6 +13,7 @@ router = Blueprint("interior", __name__)
 
 
 @router.route("/nh/interior/<string:interior>", methods=["GET"])
+@cache_response(DB_KEYS)
 def get_nh_interior(interior):
     authorize(DB_KEYS, request)
 
@@ -71,6 +72,7 @@ def get_nh_interior(interior):
 
 
 @router.route("/nh/interior", methods=["GET"])
+@cache_response(DB_KEYS)
 def get_nh_interior_all():
     authorize(DB_KEYS, request)
 
@@ -2,7 +2,7 @@ import requests
 from flask import abort, jsonify, request, Blueprint
 
 from nookipedia.config import DB_KEYS, ITEMS_LIMIT
-from nookipedia.middlewares import authorize
+from nookipedia.middlewares import authorize, cache_response
 from nookipedia.cargo import call_cargo, get_other_item_list
 from nookipedia.errors import error_response
 from nookipedia.models import format_other_item
@@ -13,6 +13,7 @@ router = Blueprint("items", __name__)
 
 
 @router.route("/nh/items/<string:item>", methods=["GET"])
+@cache_response(DB_KEYS)
 def get_nh_item(item):
     authorize(DB_KEYS, request)
 
@@ -70,6 +71,7 @@ def get_nh_item(item):
 
 
 @router.route("/nh/items", methods=["GET"])
+@cache_response(DB_KEYS)
 def get_nh_item_all():
     authorize(DB_KEYS, request)
 
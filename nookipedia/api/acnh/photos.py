@@ -2,17 +2,23 @@ import requests
 from flask import abort, jsonify, request, Blueprint
 
 from nookipedia.config import DB_KEYS, PHOTO_LIMIT, PHOTO_VARIATION_LIMIT
-from nookipedia.middlewares import authorize
-from nookipedia.cargo import call_cargo, get_variation_list, get_photo_list
+from nookipedia.middlewares import authorize, cache_response
+from nookipedia.cargo import get_variation_list, get_photo_list
+from nookipedia.cargo_async import call_cargo_batch, run_concurrent
 from nookipedia.errors import error_response
-from nookipedia.models import format_photo, stitch_variation, stitch_variation_list
+from nookipedia.models import (
+    format_photo,
+    stitch_variation,
+    stitch_variation_list,
+    stitch_variation_names,
+)
 from nookipedia.utility import generate_fields
 
-
 router = Blueprint("photos", __name__)
 
 
 @router.route("/nh/photos/<string:photo>", methods=["GET"])
+@cache_response(DB_KEYS)
 def get_nh_photo(photo):
     authorize(DB_KEYS, request)
 
@@ -65,7 +71,7 @@ def get_nh_photo(photo):
         "limit": variation_limit,
     }
 
-    cargo_results = call_cargo(photo_params, request.args)
+    cargo_results, variations = call_cargo_batch([photo_params, variation_params], request.args)
     if len(cargo_results) == 0:
         abort(
             404,
@@ -76,22 +82,14 @@ def get_nh_photo(photo):
         )
     else:
         piece = format_photo(cargo_results[0])
-        variations = call_cargo(variation_params, request.args)
         return jsonify(stitch_variation(piece, variations))
 
 
 @router.route("/nh/photos", methods=["GET"])
+@cache_response(DB_KEYS)
 def get_nh_photo_all():
     authorize(DB_KEYS, request)
 
-    if "thumbsize" in request.args:
-        abort(
-            400,
-            description=error_response(
-                "Invalid arguments", "Cannot have thumbsize in a group item request"
-            ),
-        )
-
     photo_limit = PHOTO_LIMIT
     photo_tables = "nh_photo"
     photo_fields = generate_fields(
@@ -121,13 +119,14 @@ def get_nh_photo_all():
     variation_fields = generate_fields("en_name=name", "variation", "image_url", "color1", "color2")
     variation_orderby = "variation_number"
 
-    photo_list = get_photo_list(photo_limit, photo_tables, photo_fields)
-    variation_list = get_variation_list(
-        variation_limit, variation_tables, variation_fields, variation_orderby
+    photo_list, variation_list = run_concurrent(
+        lambda: get_photo_list(photo_limit, photo_tables, photo_fields),
+        lambda: get_variation_list(
+            variation_limit, variation_tables, variation_fields, variation_orderby
+        ),
     )
-    stitched = stitch_variation_list(photo_list, variation_list)
-
+    # With excludedetails the lists above only hold names (see nookipedia.cargo.names_only)
     if request.args.get("excludedetails") == "true":
-        return jsonify([_["name"] for _ in stitched])
+        return jsonify(stitch_variation_names(photo_list, variation_list))
     else:
-        return jsonify(stitched)
+        return jsonify(stitch_variation_list(photo_list, variation_list))
@@ -1,7 +1,7 @@
 from flask import abort, jsonify, request, Blueprint
 
 from nookipedia.config import DB_KEYS, RECIPE_LIMIT
-from nookipedia.middlewares import authorize
+from nookipedia.middlewares import authorize, cache_response
 from nookipedia.cargo import call_cargo, get_recipe_list
 from nookipedia.errors import error_response
 from nookipedia.models import format_recipe
@@ -12,6 +12,7 @@ router = Blueprint("recipes", __name__)
 
 
 @router.route("/nh/recipes/<string:recipe>", methods=["GET"])
+@cache_response(DB_KEYS)
 def get_nh_recipe(recipe):
     authorize(DB_KEYS, request)
 
@@ -70,6 +71,7 @@ def get_nh_recipe(recipe):
 
 
 @router.route("/nh/recipes", methods=["GET"])
+@cache_response(DB_KEYS)
 def get_nh_recipe_all():
     authorize(DB_KEYS, request)
 
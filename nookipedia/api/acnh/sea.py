@@ -2,7 +2,7 @@ import requests
 from flask import abort, jsonify, request, Blueprint
 
 from nookipedia.config import DB_KEYS, SEA_LIMIT
-from nookipedia.middlewares import authorize
+from nookipedia.middlewares import authorize, cache_response
 from nookipedia.cargo import call_cargo, get_critter_list
 from nookipedia.errors import error_response
 from nookipedia.models import exact_version, months_to_array, format_critters
@@ -14,6 +14,7 @@ router = Blueprint("sea", __name__)
 
 # All New Horizons sea creatures
 @router.route("/nh/sea", methods=["GET"])
+@cache_response(DB_KEYS)
 def get_nh_sea_all():
     authorize(DB_KEYS, request)
 
@@ -126,6 +127,7 @@ def get_nh_sea_all():
 
 # Specific New Horizons sea creature
 @router.route("/nh/sea/<string:sea>", methods=["GET"])
+@cache_response(DB_KEYS)
 def get_nh_sea(sea):
     authorize(DB_KEYS, request)
 
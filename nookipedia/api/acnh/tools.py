@@ -2,17 +2,23 @@ import requests
 from flask import abort, jsonify, request, Blueprint
 
 from nookipedia.config import DB_KEYS, TOOL_LIMIT, TOOL_VARIATION_LIMIT
-from nookipedia.middlewares import authorize
-from nookipedia.cargo import call_cargo, get_variation_list, get_tool_list
+from nookipedia.middlewares import authorize, cache_response
+from nookipedia.cargo import get_variation_list, get_tool_list
+from nookipedia.cargo_async import call_cargo_batch, run_concurrent
 from nookipedia.errors import error_response
-from nookipedia.models import format_tool, stitch_variation, stitch_variation_list
+from nookipedia.models import (
+    format_tool,
+    stitch_variation,
+    stitch_variation_list,
+    stitch_variation_names,
+)
 from nookipedia.utility import generate_fields
 
-
 router = Blueprint("tools", __name__)
 
 
 @router.route("/nh/tools/<string:tool>", methods=["GET"])
+@cache_response(DB_KEYS)
 def get_nh_tool(tool):
     authorize(DB_KEYS, request)
 
@@ -66,7 +72,7 @@ def get_nh_tool(tool):
         "limit": variation_limit,
     }
 
-    cargo_results = call_cargo(tool_params, request.args)
+    cargo_results, variations = call_cargo_batch([tool_params, variation_params], request.args)
     if len(cargo_results) == 0:
         abort(
             404,
@@ -77,22 +83,14 @@ def get_nh_tool(tool):
         )
     else:
         piece = format_tool(cargo_results[0])
-        variations = call_cargo(variation_params, request.args)
         return jsonify(stitch_variation(piece, variations))
 
 
 @router.route("/nh/tools", methods=["GET"])
+@cache_response(DB_KEYS)
 def get_nh_tool_all():
     authorize(DB_KEYS, request)
 
-    if "thumbsize" in request.args:
-        abort(
-            400,
-            description=error_response(
-                "Invalid arguments", "Cannot have thumbsize in a group item request"
-            ),
-        )
-
     tool_limit = TOOL_LIMIT
     tool_tables = "nh_tool"
     tool_fields = generate_fields(
@@ -123,13 +121,14 @@ def get_nh_tool_all():
     variation_fields = generate_fields("en_name=name", "variation", "image_url")
     variation_orderby = "variation_number"
 
-    tool_list = get_tool_list(tool_limit, tool_tables, tool_fields)
-    variation_list = get_variation_list(
-        variation_limit, variation_tables, variation_fields, variation_orderby
+    tool_list, variation_list = run_concurrent(
+        lambda: get_tool_list(tool_limit, tool_tables, tool_fields),
+        lambda: get_variation_list(
+            variation_limit, variation_tables, variation_fields, variation_orderby
+        ),
     )
-    stitched = stitch_variation_list(tool_list, variation_list)
-
+    # With excludedetails the lists above only hold names (see nookipedia.cargo.names_only)
     if request.args.get("excludedetails") == "true":
-        return jsonify([_["name"] for _ in stitched])
+        return jsonify(stitch_variation_names(tool_list, variation_list))
     else:
-        return jsonify(stitched)
+        return jsonify(stitch_variation_list(tool_list, variation_list))
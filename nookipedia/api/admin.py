@@ -1,12 +1,12 @@
 import uuid
 from flask import abort, jsonify, request, Blueprint
 
-from nookipedia import db
+from nookipedia import db, metrics, upstream
+from nookipedia.cache import cache
 from nookipedia.config import DB_ADMIN_KEYS, DB_KEYS
 from nookipedia.middlewares import authorize
 from nookipedia.errors import error_response
 
-
 router = Blueprint("admin", __name__)
 
 
@@ -42,3 +42,34 @@ def generate_key():
                 "UUID generation, or UUID insertion into keys table, failed.",
             ),
         )
+
+
+@router.route("/admin/cargo/sizes", methods=["GET"])
+def get_cargo_sizes():
+    authorize(DB_ADMIN_KEYS, request)
+
+    try:
+        sizes = cache.get("cargo_table_sizes") or {}
+    except Exception:
+        abort(
+            500,
+            description=error_response(
+                "Failed to read Cargo table sizes.",
+                "Discovered table sizes could not be read from the cache.",
+            ),
+        )
+    return jsonify(sizes)
+
+
+@router.route("/admin/metrics", methods=["GET"])
+def get_metrics():
+    authorize(DB_ADMIN_KEYS, request)
+
+    return jsonify(metrics.snapshot())
+
+
+@router.route("/admin/upstream", methods=["GET"])
+def get_upstream_status():
+    authorize(DB_ADMIN_KEYS, request)
+
+    return jsonify({"breaker": upstream.breaker.status(), "bulkhead": upstream.bulkhead.status()})
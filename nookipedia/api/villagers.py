@@ -1,7 +1,7 @@
 from flask import request, Blueprint
 
 from nookipedia.config import DB_KEYS, VILLAGER_LIMIT
-from nookipedia.middlewares import authorize
+from nookipedia.middlewares import authorize, cache_response
 from nookipedia.cargo import get_villager_list
 
 
@@ -9,6 +9,7 @@ router = Blueprint("villagers", __name__)
 
 
 @router.route("/villagers", methods=["GET"])
+@cache_response(DB_KEYS)
 def get_villager_all():
     authorize(DB_KEYS, request)
 
@@ -0,0 +1,218 @@
+import json
+import os
+import threading
+import time
+
+import requests
+
+from nookipedia import metrics, upstream
+from nookipedia.cache import acquire_lease, cache, release_lease
+from nookipedia.config import (
+    BASE_URL_API,
+    BOT_USERNAME,
+    BOT_PASS,
+    BOT_SESSION_FILE,
+    BOT_SESSION_REFRESH_AHEAD,
+    BOT_SESSION_TTL,
+)
+
+
+# Login to MediaWiki as a bot account; returns the new session, or None on failure:
+def mw_login():
+    metrics.incr("bot_login_attempts")
+    try:
+        params = {"action": "query", "meta": "tokens", "type": "login", "format": "json"}
+        r = upstream.get(url=BASE_URL_API, params=params)
+        try:
+            login_token = r.json()["query"]["tokens"]["logintoken"]
+        except:
+            print("Failed to login to MediaWiki (could not retrieve login token).")
+            login_token = None
+
+        if login_token:
+            data = {
+                "action": "login",
+                "lgname": BOT_USERNAME,
+                "lgpassword": BOT_PASS,
+                "lgtoken": login_token,
+                "format": "json",
+            }
+            r = upstream.post(
+                url=BASE_URL_API,
+                data=data,
+                cookies=requests.utils.dict_from_cookiejar(r.cookies),
+            )
+            rJson = r.json()
+
+            if rJson.get("login", {}).get("result") == "Success":
+                print("Successfully logged into MediaWiki API.")
+                return {
+                    "token": login_token,
+                    "cookie": requests.utils.dict_from_cookiejar(r.cookies),
+                    "expires": time.time() + BOT_SESSION_TTL,
+                }
+            print("Failed to login to MediaWiki (POST to login failed): " + str(rJson))
+    except:
+        print("Failed to login to MediaWiki.")
+    metrics.incr("bot_login_failures")
+    return None
+
+
+class BotSession:
+    # Hands out the MediaWiki bot session, looking in this process, then memcached, then disk.
+    # Only one login runs at a time: one thread per worker, and one worker per fleet (via a lease).
+    # Sessions are renewed ahead of expiry so requests don't wait on a login.
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.session = None
+
+    def get(self):
+        session = self.session
+        if not usable(session):
+            session = self.load()
+        if usable(session) and session["expires"] - time.time() > BOT_SESSION_REFRESH_AHEAD:
+            return session
+
+        # Expiring soon: whoever gets the lock renews it, everyone else keeps the current one
+        if usable(session):
+            if self.lock.acquire(blocking=False):
+                try:
+                    # Another worker may already have renewed it
+                    renewed = self.load_fresh() or self.login(wait=False)
+                finally:
+                    self.lock.release()
+                return renewed or session
+            return session
+
+        with self.lock:
+            # Another thread may have logged in while we waited on the lock
+            session = self.session if usable(self.session) else self.load()
+            if usable(session):
+                return session
+            return self.login(wait=True)
+
+    def renew(self, rejected):
+        # The wiki rejected this session; drop it everywhere and log in again.
+        with self.lock:
+            if self.session and self.session.get("token") != rejected.get("token"):
+                return self.session  # Someone already replaced it
+            self.session = None
+            try:
+                current = cache.get("session")
+            except Exception:
+                current = None
+            if usable(current) and current["token"] != rejected.get("token"):
+                self.session = current  # Another worker already logged in again
+                return current
+            try:
+                cache.delete("session")
+            except Exception:
+                pass
+            stored = read_session_file()
+            if stored and stored.get("token") == rejected.get("token"):
+                remove_session_file()
+            return self.login(wait=True)
+
+    def load(self):
+        try:
+            session = cache.get("session")  # Get session from memcache
+        except Exception:
+            session = None
+        if not usable(session):
+            session = read_session_file()
+            if usable(session):
+                self.store_shared(session)
+        if usable(session):
+            self.session = session
+        return session if usable(session) else None
+
+    def load_fresh(self):
+        # The shared session, if it isn't due for renewal yet
+        try:
+            session = cache.get("session")
+        except Exception:
+            session = None
+        if usable(session) and session["expires"] - time.time() > BOT_SESSION_REFRESH_AHEAD:
+            self.session = session
+            return session
+        return None
+
+    def login(self, wait):
+        token = acquire_lease("bot_login", 30)
+        if token is None:
+            # Another worker is logging in; give it a moment and pick up its session
+            if not wait:
+                return None
+            deadline = time.monotonic() + upstream.within_deadline(10)
+            while time.monotonic() < deadline:
+                time.sleep(0.2)
+                try:
+                    session = cache.get("session")
+                except Exception:
+                    session = None
+                if usable(session):
+                    self.session = session
+                    return session
+            return None
+
+        try:
+            # The worker that held the lease before us may have just logged in
+            session = self.load_fresh()
+            if session:
+                return session
+            session = mw_login()
+            if session:
+                self.session = session
+                self.store_shared(session)
+                write_session_file(session)
+            return session
+        finally:
+            release_lease("bot_login", token)
+
+    def store_shared(self, session):
+        try:
+            cache.set("session", session, max(int(session["expires"] - time.time()), 1))
+        except Exception:
+            print("Warning: could not persist MediaWiki session to cache.")
+
+
+def usable(session):
+    return (
+        isinstance(session, dict) and "token" in session and session.get("expires", 0) > time.time()
+    )
+
+
+def read_session_file():
+    if not BOT_SESSION_FILE:
+        return None
+    try:
+        with open(BOT_SESSION_FILE) as f:
+            return json.load(f)
+    except Exception:
+        return None
+
+
+def write_session_file(session):
+    if not BOT_SESSION_FILE:
+        return
+    try:
+        # The file holds login cookies, so keep it private to the API's user
+        fd = os.open(BOT_SESSION_FILE + ".tmp", os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, "w") as f:
+            json.dump(session, f)
+        os.replace(BOT_SESSION_FILE + ".tmp", BOT_SESSION_FILE)
+    except Exception:
+        print("Warning: could not persist MediaWiki session to disk.")
+
+
+def remove_session_file():
+    if not BOT_SESSION_FILE:
+        return
+    try:
+        os.remove(BOT_SESSION_FILE)
+    except Exception:
+        pass
+
+
+bot_session = BotSession()
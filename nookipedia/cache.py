@@ -1,8 +1,24 @@
+from collections import OrderedDict
+import hashlib
+import json
+import sys
 import threading
+import time
+import uuid
+import zlib
 
 from flask_caching import Cache
 from pylibmc import Client as PylibmcClient
 
+from nookipedia import metrics
+from nookipedia.config import (
+    CACHE_CHUNK_SIZE,
+    CACHE_COMPRESS_LEVEL,
+    CACHE_COMPRESS_THRESHOLD,
+    CACHE_LOCAL_MAX_BYTES,
+    CACHE_LOCAL_TTL,
+)
+
 SERVERS = ["127.0.0.1"]
 BEHAVIORS = {
     "connect_timeout": 1000,  # ms
@@ -44,3 +60,189 @@ class ThreadLocalClient:
 mc_client = ThreadLocalClient()
 
 cache = Cache(config={"CACHE_TYPE": "memcached", "CACHE_MEMCACHED_SERVERS": mc_client})
+
+
+# Leases let exactly one worker in the fleet regenerate a key.
+# Returns a token when this caller holds the lease, None if another worker does.
+def acquire_lease(key, ttl):
+    token = uuid.uuid4().hex
+    try:
+        if cache.add("lease:" + key, token, timeout=ttl):
+            return token
+        return None
+    except Exception:
+        return token  # memcached unavailable; nothing to coordinate with
+
+
+def release_lease(key, token):
+    try:
+        if cache.get("lease:" + key) == token:
+            cache.delete("lease:" + key)
+    except Exception:
+        pass
+
+
+# Large values are stored zlib-compressed. The first byte of a packed value says how the rest
+# is stored; values written as plain str before packing existed are still read as-is.
+MARKER_PLAIN = b"p"
+MARKER_ZLIB = b"z"
+# Values too big for one memcached item are stored as a manifest with this marker (see set_packed)
+MARKER_CHUNKED = b"c"
+
+
+def pack_value(value, label):
+    raw = value.encode() if isinstance(value, str) else value
+    if len(raw) < CACHE_COMPRESS_THRESHOLD:
+        return MARKER_PLAIN + raw
+    started = time.thread_time()
+    packed = zlib.compress(raw, CACHE_COMPRESS_LEVEL)
+    metrics.observe("cache_compress_cpu_seconds:" + label, time.thread_time() - started)
+    # Compression ratio for a label is cache_raw_bytes / cache_packed_bytes
+    metrics.incr("cache_raw_bytes:" + label, len(raw))
+    metrics.incr("cache_packed_bytes:" + label, len(packed) + 1)
+    return MARKER_ZLIB + packed
+
+
+def unpack_value(value, label):
+    if isinstance(value, str):
+        return value
+    marker, body = value[:1], value[1:]
+    if marker == MARKER_ZLIB:
+        started = time.thread_time()
+        body = zlib.decompress(body)
+        metrics.observe("cache_decompress_cpu_seconds:" + label, time.thread_time() - started)
+    elif marker != MARKER_PLAIN:
+        raise ValueError("Unknown cache value marker {!r}".format(marker))
+    return body
+
+
+# memcached rejects items over its slab size (1 MB by default), so bigger packed values are split
+# into CACHE_CHUNK_SIZE chunks. The key itself then holds a manifest naming the chunks by the
+# content hash: chunks of an older value never mix with a newer one, and a reader either gets
+# every chunk of the value it was pointed at or treats the key as a miss.
+def set_packed(key, value, timeout):
+    if len(value) <= CACHE_CHUNK_SIZE:
+        return checked_set(key, value, timeout)
+
+    digest = hashlib.sha1(value).hexdigest()
+    chunks = {
+        "{}:chunk:{}:{}".format(key, digest, i): value[offset : offset + CACHE_CHUNK_SIZE]
+        for i, offset in enumerate(range(0, len(value), CACHE_CHUNK_SIZE))
+    }
+    if not cache.set_many(chunks, timeout=timeout):
+        print("Cache set rejected: key={} bytes={} chunks={}".format(key, len(value), len(chunks)))
+        metrics.incr("cache_set_rejected")
+        return False
+    metrics.incr("cache_chunked_sets")
+    manifest = {"hash": digest, "chunks": len(chunks), "bytes": len(value)}
+    return checked_set(key, MARKER_CHUNKED + json.dumps(manifest).encode(), timeout)
+
+
+def get_packed(key):
+    value = cache.get(key)
+    if not isinstance(value, bytes) or value[:1] != MARKER_CHUNKED:
+        return value
+
+    manifest = json.loads(value[1:])
+    chunk_keys = [
+        "{}:chunk:{}:{}".format(key, manifest["hash"], i) for i in range(manifest["chunks"])
+    ]
+    chunks = cache.get_many(*chunk_keys)
+    if any(chunk is None for chunk in chunks):
+        metrics.incr("cache_chunk_misses")
+        return None  # A chunk was evicted; the whole value is gone
+    value = b"".join(chunks)
+    if hashlib.sha1(value).hexdigest() != manifest["hash"]:
+        metrics.incr("cache_chunk_misses")
+        return None
+    return value
+
+
+def checked_set(key, value, timeout):
+    # The memcached client reports oversized items either by returning False or by raising
+    try:
+        stored = cache.set(key, value, timeout=timeout)
+    except Exception as e:
+        print("Cache set rejected: key={} bytes={} ({})".format(key, len(value), e))
+        metrics.incr("cache_set_rejected")
+        return False
+    if not stored:
+        print("Cache set rejected: key={} bytes={}".format(key, len(value)))
+        metrics.incr("cache_set_rejected")
+    return stored
+
+
+class LocalCache:
+    # Per-process LRU of unpacked cache values in front of memcached, bounded by
+    # max_bytes and holding entries for at most ttl seconds. Each entry remembers the
+    # generation of its key when it was filled (see get_value).
+
+    def __init__(self, max_bytes, ttl):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()  # key -> (value, generation, expires, size)
+        self.size = 0
+
+    def get(self, key, generation):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            value, entry_generation, expires, _ = entry
+            if entry_generation != generation or time.monotonic() > expires:
+                self.remove(key)
+                return None
+            self.entries.move_to_end(key)
+            return value
+
+    def put(self, key, value, generation):
+        size = sys.getsizeof(value)
+        if size > self.max_bytes:
+            return
+        with self.lock:
+            self.remove(key)
+            self.entries[key] = (value, generation, time.monotonic() + self.ttl, size)
+            self.size += size
+            while self.size > self.max_bytes:
+                self.remove(next(iter(self.entries)))
+                metrics.incr("cache_local_evictions")
+
+    def remove(self, key):
+        entry = self.entries.pop(key, None)
+        if entry is not None:
+            self.size -= entry[3]
+
+
+local_cache = LocalCache(CACHE_LOCAL_MAX_BYTES, CACHE_LOCAL_TTL)
+
+
+# Read and unpack a value, from this process's copy when it's still current.
+# Every write of a key also sets a small "gen:" key; a local copy is only used while
+# memcached still reports the generation it was filled under, so a write from any worker
+# invalidates every other worker's copy.
+def get_value(key, label):
+    try:
+        generation = cache.get("gen:" + key)
+    except Exception:
+        generation = None
+    value = local_cache.get(key, generation)
+    if value is not None:
+        metrics.incr("cache_local_hits")
+        return value
+    metrics.incr("cache_local_misses")
+
+    # Fetched after the generation, so a concurrent write can only make our copy look older
+    packed = get_packed(key)
+    if packed is None:
+        return None
+    value = unpack_value(packed, label)
+    local_cache.put(key, value, generation)
+    return value
+
+
+# Publish a new generation of a key just written with set_packed, keeping its value locally:
+def set_generation(key, value, timeout):
+    generation = uuid.uuid4().hex
+    cache.set("gen:" + key, generation, timeout=timeout)
+    local_cache.put(key, value, generation)
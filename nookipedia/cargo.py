@@ -1,14 +1,56 @@
 from datetime import datetime
 from dateutil import parser
-from flask import abort, jsonify, request
+from flask import abort, current_app, g, jsonify, request
+import copy
 import hashlib
 import json
-import requests
+import random
+import time
 import urllib.parse
-from nookipedia.cache import cache
-from nookipedia.utility import deep_unescape, params_where, month_to_string, month_to_int
-from nookipedia.config import BASE_URL_API, BASE_URL_WIKI, BOT_USERNAME, BOT_PASS
+from werkzeug.exceptions import HTTPException
+from nookipedia import metrics, upstream
+from nookipedia.bot_session import bot_session
+from nookipedia.cache import (
+    acquire_lease,
+    cache,
+    get_packed,
+    get_value,
+    pack_value,
+    release_lease,
+    set_generation,
+    set_packed,
+    unpack_value,
+)
+from nookipedia.utility import (
+    add_response_header,
+    deep_unescape,
+    dedupe_rows,
+    params_where,
+    project_fields,
+    month_to_string,
+    month_to_int,
+)
+from nookipedia.config import (
+    BASE_URL_API,
+    BOT_USERNAME,
+    CARGO_COUNT_TTL,
+    CARGO_FLIGHT_TIMEOUT,
+    CARGO_HARD_TTL,
+    CARGO_LEASE_POLL,
+    CARGO_LEASE_TTL,
+    CARGO_LEASE_WAIT,
+    CARGO_MAX_RETRIES,
+    CARGO_PAGE_WORKERS,
+    CARGO_REFRESH_WORKERS,
+    CARGO_RETRY_BACKOFF,
+    CARGO_RETRY_BUDGET,
+    CARGO_SOFT_TTL,
+    CARGO_STALE_TTL,
+)
 from nookipedia.errors import error_response
+from nookipedia.serialization import decode_entry, encode_entry
+from nookipedia.singleflight import Refresher, SingleFlight
+from nookipedia.thumbnails import apply_thumbnails, thumbnail_width
 from nookipedia.models import (
     format_villager,
     months_to_array,
@@ -26,71 +68,265 @@ from nookipedia.models import (
     format_gyroid,
 )
 
+cargo_flights = SingleFlight()
+cargo_refresher = Refresher(CARGO_REFRESH_WORKERS)
+
+
+# Fetch a single offset window of a Cargo query:
+def fetch_cargo_page(parameters, offset, limit):
+    # Copy the passed-in parameters:
+    nestedparameters = parameters.copy()
+    nestedparameters["limit"] = str(limit)
+    nestedparameters["offset"] = str(offset)
+
+    # Check if auth is needed
+    if BOT_USERNAME and int(parameters.get("limit", "50")) > 500:
+        nestedparameters["assert"] = "bot"
+        session = bot_session.get()
+
+        # Make authorized request
+        if session:
+            r = upstream.get(
+                url=BASE_URL_API,
+                params=nestedparameters,
+                headers={"Authorization": "Bearer " + session.get("token", "")},
+                cookies=session.get("cookie"),
+            )
+            if "error" in r.json():
+                # Error may be due to invalid token
+                # Re-try login
+                session = bot_session.renew(session)
+                if session:
+                    r = upstream.get(
+                        url=BASE_URL_API,
+                        params=nestedparameters,
+                        headers={"Authorization": "Bearer " + session.get("token", "")},
+                        cookies=session.get("cookie"),
+                    )
+
+        # If login failed or it errors again, make request without auth:
+        if not session or "error" in r.json():
+            del nestedparameters["assert"]
+            r = upstream.get(url=BASE_URL_API, params=nestedparameters)
+    else:
+        r = upstream.get(url=BASE_URL_API, params=nestedparameters)
+
+    print("Cargo request: {}".format(r.url))
+    return r.json()
+
+
+# Count the rows a Cargo query would return (ignoring its limit), or None if Cargo won't say:
+def count_cargo_rows(parameters):
+    # A grouped query returns one row per distinct value of the column it groups by
+    if parameters.get("group_by"):
+        count_field = "COUNT(DISTINCT {})=count".format(parameters["group_by"])
+    else:
+        count_field = "COUNT(*)=count"
+    count_parameters = {
+        "action": "cargoquery",
+        "format": "json",
+        "tables": parameters["tables"],
+        "fields": count_field,
+        "limit": "1",
+    }
+    for key in ("join_on", "where"):
+        if parameters.get(key):
+            count_parameters[key] = parameters[key]
+
+    count_key = (
+        "cargo_count:" + hashlib.md5(str(sorted(count_parameters.items())).encode()).hexdigest()
+    )
+    try:
+        count = cache.get(count_key)
+        if count is not None:
+            return count
+    except Exception:
+        pass
 
-# Login to MediaWiki as a bot account:
-def mw_login():
     try:
-        params = {"action": "query", "meta": "tokens", "type": "login", "format": "json"}
-        r = requests.get(url=BASE_URL_API, params=params, timeout=10)
-        try:
-            login_token = r.json()["query"]["tokens"]["logintoken"]
-        except:
-            print("Failed to login to MediaWiki (could not retrieve login token).")
-            return False
-
-        if login_token:
-            data = {
-                "action": "login",
-                "lgname": BOT_USERNAME,
-                "lgpassword": BOT_PASS,
-                "lgtoken": login_token,
-                "format": "json",
+        rjson = fetch_cargo_page(count_parameters, 0, 1)
+        count = int(rjson["cargoquery"][0]["title"]["count"])
+    except Exception:
+        print("Could not count rows for Cargo query: {}".format(count_parameters))
+        return None
+
+    try:
+        cache.set(count_key, count, timeout=CARGO_COUNT_TTL)
+        # Keep a record of whole-table sizes for the admin endpoint
+        if "where" not in count_parameters and "group_by" not in parameters:
+            sizes = cache.get("cargo_table_sizes") or {}
+            sizes[count_parameters["tables"]] = {
+                "rows": count,
+                "checked": datetime.utcnow().isoformat(timespec="seconds") + "Z",
             }
-            r = requests.post(
-                url=BASE_URL_API,
-                data=data,
-                cookies=requests.utils.dict_from_cookiejar(r.cookies),
-                timeout=10,
+            cache.set("cargo_table_sizes", sizes, timeout=0)
+    except Exception:
+        pass
+    return count
+
+
+class IncompleteCargoResponse(Exception):
+    # Raised when pages are still missing fields after their retries.
+
+    def __init__(self, missing, attempts):
+        super().__init__("Cargo response missing fields {}".format(missing))
+        self.missing = missing
+        self.attempts = attempts
+
+
+# Fetch every page of a Cargo query, in order:
+def fetch_cargo_pages(parameters, expected_fields):
+    # Default query size limit is 50 but can be changed via param
+    cargolimit = int(parameters.get("limit", "50"))
+
+    # For anything bigger than a single request, plan the pages around the table's real size.
+    # The configured limit stays as a ceiling. The count may be cached from before the table
+    # grew, so plan one row past it: a short last page confirms it, a full one means keep going.
+    total = cargolimit
+    counted = False
+    if cargolimit > 500:
+        count = count_cargo_rows(parameters)
+        if count is not None:
+            total = min(count + 1, cargolimit)
+            counted = True
+
+    # The first page tells us how many rows Cargo hands out per request
+    rows, truncated = fetch_cargo_window(parameters, 0, total)
+    windows = [(0, total)]
+    pages = [rows]
+
+    # Unless nothing came back, the limit was reached, or Cargo didn't warn about truncating
+    # the page, split the rest of the rows into page-sized offset windows
+    if len(rows) > 0 and len(rows) < total and truncated:
+        page_size = len(rows)
+        windows = [(0, page_size)] + [
+            (offset, min(page_size, total - offset))
+            for offset in range(page_size, total, page_size)
+        ]
+
+        if CARGO_PAGE_WORKERS > 1:
+            rest = upstream.map_concurrent(
+                lambda window: fetch_cargo_window(parameters, *window),
+                windows[1:],
+                CARGO_PAGE_WORKERS,
             )
-            rJson = r.json()
-
-            if "login" not in rJson:
-                print("Failed to login to MediaWiki (POST to login failed): " + str(rJson))
-                return False
-            if "result" not in rJson["login"]:
-                print("Failed to login to MediaWiki (POST to login failed): " + str(rJson))
-                return False
-            if rJson["login"]["result"] == "Success":
-                print("Successfully logged into MediaWiki API.")
-                try:
-                    cache.set(
-                        "session",
-                        {
-                            "token": login_token,
-                            "cookie": requests.utils.dict_from_cookiejar(r.cookies),
-                        },
-                        2592000,
-                    )  # Expiration set to max of 30 days
-                except Exception:
-                    print("Warning: could not persist MediaWiki session to cache.")
-                return True
-            else:
-                print("Failed to login to MediaWiki (POST to login failed): " + str(rJson))
-                return False
         else:
-            print("Failed to login to MediaWiki (could not retrieve login token).")
-            return False
-    except:
-        print("Failed to login to MediaWiki.")
+            rest = (fetch_cargo_window(parameters, *window) for window in windows[1:])
+
+        for (_, limit), (rows, _) in zip(windows[1:], rest):
+            pages.append(rows)
+            # A short page means the table ran out before the limit did
+            if len(rows) < limit:
+                break
+        windows = windows[: len(pages)]
+
+    # The table outgrew its counted size: page on from where the plan ended
+    offset, limit = windows[-1]
+    more = counted and len(pages[-1]) == limit > 0
+    offset += limit
+    while more and offset < cargolimit:
+        limit = cargolimit - offset
+        rows, truncated = fetch_cargo_window(parameters, offset, limit)
+        if truncated:
+            limit = len(rows)
+        windows.append((offset, limit))
+        pages.append(rows)
+        more = len(rows) == limit > 0
+        offset += limit
+
+    retry_incomplete_pages(parameters, expected_fields, windows, pages)
+
+    return [item for rows in pages for item in rows]
+
+
+# Fetch one offset window, normalizing its rows as soon as it arrives so the raw page can be
+# dropped. Returns the rows and whether Cargo warned that it truncated the page.
+def fetch_cargo_window(parameters, offset, limit):
+    rjson = fetch_cargo_page(parameters, offset, limit)
+    return normalize_cargo_rows(rjson["cargoquery"]), "warnings" in rjson
+
+
+def normalize_cargo_rows(cargochunk):
+    rows = []
+    for obj in cargochunk:
+        item = {}
+
+        # Strip table prefix (e.g. "villager debut" -> "debut") from Cargo field names
+        for key in obj["title"]:
+            item[key.split(" ")[-1]] = obj["title"][key]
+
+        item = deep_unescape(item)
+
+        # Create url to page
+        if "url" in item:
+            item["url"] = "https://nookipedia.com/wiki/" + urllib.parse.quote(item["url"])
+
+        rows.append(item)
+    return rows
+
+
+# Expected fields absent from every row of a page (Cargo sometimes drops whole columns):
+def missing_page_fields(rows, expected_fields):
+    if not rows:
+        return []
+    all_seen = set()
+    for item in rows:
+        all_seen.update(item)
+    return [f for f in expected_fields if f not in all_seen]
+
+
+# Refetch only the offset windows whose pages came back incomplete:
+def retry_incomplete_pages(parameters, expected_fields, windows, pages):
+    for attempt in range(CARGO_MAX_RETRIES + 1):
+        missing = {}
+        for i, rows in enumerate(pages):
+            page_missing = missing_page_fields(rows, expected_fields)
+            if page_missing:
+                missing[i] = page_missing
+        if not missing:
+            return
+
+        all_missing = sorted({f for page_missing in missing.values() for f in page_missing})
+        if attempt == CARGO_MAX_RETRIES or not take_retry_budget(len(missing)):
+            raise IncompleteCargoResponse(all_missing, attempt + 1)
+
+        print(
+            "Cargo pages {} missing fields {} on attempt {}/{}, retrying...".format(
+                [windows[i] for i in missing], all_missing, attempt + 1, CARGO_MAX_RETRIES + 1
+            )
+        )
+        # Exponential backoff with full jitter
+        delay = random.uniform(0, CARGO_RETRY_BACKOFF * 2**attempt)
+        left = upstream.time_left()
+        if left is not None and left <= delay:
+            print("No time left to retry Cargo pages before the request deadline.")
+            raise IncompleteCargoResponse(all_missing, attempt + 1)
+        time.sleep(delay)
+        refetched = upstream.map_concurrent(
+            lambda i: fetch_cargo_window(parameters, *windows[i]), missing, CARGO_PAGE_WORKERS
+        )
+        for i, (rows, _) in zip(missing, refetched):
+            pages[i] = rows
+
+
+# Every API request gets a fixed number of page retries, shared by all of its Cargo queries:
+def take_retry_budget(pages):
+    left = g.get("cargo_retry_budget", CARGO_RETRY_BUDGET)
+    if pages > left:
+        print("Cargo retry budget exhausted for this request.")
+        metrics.incr("cargo_retry_budget_exhausted")
         return False
+    g.cargo_retry_budget = left - pages
+    metrics.incr("cargo_page_retries", pages)
+    return True
 
 
 def call_cargo(parameters, request_args):
+    # Widths that snap to the same thumbnail bucket share a cache entry
+    thumbsize = thumbnail_width(request_args.get("thumbsize"))
     cache_key = (
         "cargo:"
-        + hashlib.md5(
-            (str(sorted(parameters.items())) + str(request_args.get("thumbsize", ""))).encode()
-        ).hexdigest()
+        + hashlib.md5((str(sorted(parameters.items())) + str(thumbsize or "")).encode()).hexdigest()
     )
     print(
         "Cache lookup: key={} table={} path={}".format(
@@ -98,17 +334,125 @@ def call_cargo(parameters, request_args):
         )
     )
     try:
-        cached = cache.get(cache_key)
+        cached = get_value(cache_key, parameters.get("tables", "?"))
         if cached is not None:
             print(
                 "Cache hit: key={} table={} path={}".format(
                     cache_key, parameters.get("tables", "?"), request.path
                 )
             )
-            return json.loads(cached)
+            data, fresh = load_cargo(cached)
+            if not fresh:
+                # Past its soft expiry: answer now, refresh behind the scenes
+                schedule_cargo_refresh(parameters, cache_key, thumbsize)
+            return data
     except Exception:
         pass
 
+    # Concurrent misses for the same key in this worker share one upstream fetch. The headers
+    # marking a degraded result travel with it, so every request sharing the flight sends them
+    # (and the response cache skips all of them), not just the one that ran it
+    try:
+        data, headers = cargo_flights.do(
+            cache_key,
+            lambda: regenerate_cargo(parameters, cache_key, thumbsize),
+            upstream.within_deadline(CARGO_FLIGHT_TIMEOUT),
+        )
+    except HTTPException as e:
+        if e.code != 500:
+            raise
+        # Cargo failed or came back incomplete; fall back to the last good copy if we have one
+        try:
+            last_good = get_packed("stale:" + cache_key)
+        except Exception:
+            last_good = None
+        if last_good is None:
+            raise
+        print("Serving last good copy after Cargo failure: key={}".format(cache_key))
+        metrics.incr("cargo_last_good_served")
+        add_response_header("X-Stale-Data", "true")
+        return load_cargo(unpack_value(last_good, parameters.get("tables", "?")))[0]
+    for name, value in headers.items():
+        add_response_header(name, value)
+    return data
+
+
+# Cache a Cargo result, plus a longer-lived last good copy to serve while it is being
+# regenerated or when Cargo is failing. Entries carry their soft expiry; memcached drops them at the hard expiry.
+def store_cargo(cache_key, data, table):
+    value = encode_entry({"expires": time.time() + CARGO_SOFT_TTL, "data": data})
+    payload = pack_value(value, table)
+    try:
+        set_packed(cache_key, payload, CARGO_HARD_TTL)
+        set_packed("stale:" + cache_key, payload, CARGO_STALE_TTL)
+        set_generation(cache_key, value, CARGO_HARD_TTL)
+    except Exception:
+        pass
+
+
+# Decode a cached Cargo entry into (data, still fresh):
+def load_cargo(value):
+    entry = decode_entry(value)
+    if isinstance(entry, list):  # Written before entries carried a soft expiry
+        return entry, True
+    return entry["data"], time.time() < entry["expires"]
+
+
+def schedule_cargo_refresh(parameters, cache_key, thumbsize):
+    app = current_app._get_current_object()
+
+    def refresh():
+        with app.app_context():
+            # Another worker may already be on it; its result will reach us through the cache
+            token = acquire_lease(cache_key, CARGO_LEASE_TTL)
+            if token is None:
+                return
+            try:
+                fetch_cargo(parameters, cache_key, thumbsize)
+                metrics.incr("cargo_background_refreshes")
+            finally:
+                release_lease(cache_key, token)
+
+    if cargo_refresher.submit(cache_key, refresh):
+        metrics.incr("cargo_refreshes_scheduled")
+
+
+# Only one worker in the fleet regenerates an expired key; the rest wait for it or serve stale data.
+# Returns the rows and the response headers to send with them:
+def regenerate_cargo(parameters, cache_key, thumbsize):
+    token = acquire_lease(cache_key, CARGO_LEASE_TTL)
+    if token is not None:
+        metrics.incr("cargo_lease_wins")
+        try:
+            return fetch_cargo(parameters, cache_key, thumbsize)
+        finally:
+            release_lease(cache_key, token)
+
+    metrics.incr("cargo_lease_waits")
+    try:
+        stale = get_packed("stale:" + cache_key)
+        if stale is not None:
+            print("Serving stale copy while another worker regenerates: key={}".format(cache_key))
+            data = load_cargo(unpack_value(stale, parameters.get("tables", "?")))[0]
+            return data, {"X-Stale-Data": "true"}
+
+        deadline = time.monotonic() + upstream.within_deadline(CARGO_LEASE_WAIT)
+        while time.monotonic() < deadline:
+            time.sleep(CARGO_LEASE_POLL)
+            cached = get_value(cache_key, parameters.get("tables", "?"))
+            if cached is not None:
+                return load_cargo(cached)[0], {}
+    except Exception:
+        pass
+
+    # The lease holder didn't deliver in time; fetch it ourselves
+    metrics.incr("cargo_lease_timeouts")
+    return fetch_cargo(parameters, cache_key, thumbsize)
+
+
+# Fetch, normalize and cache the full result of a Cargo query.
+# Returns the rows and the response headers to send with them:
+def fetch_cargo(parameters, cache_key, thumbsize):
     # Check for incomplete responses
     expected_fields = []
     for field_spec in parameters.get("fields", "").split(","):
@@ -118,226 +462,51 @@ def call_cargo(parameters, request_args):
         else:
             expected_fields.append(field_spec.replace(".", " ").split(" ")[-1].strip())
 
-    MAX_RETRIES = 2
-
-    for attempt in range(MAX_RETRIES + 1):
-        # Default query size limit is 50 but can be changed via param
-        cargolimit = int(parameters.get("limit", "50"))
-
-        # Copy the passed-in parameters:
-        nestedparameters = parameters.copy()
-        cargoquery = []
-        raw_responses = []
-
-        try:
-            while True:
-                # Subtract number of queried items from limit
-                nestedparameters["limit"] = str(cargolimit - len(cargoquery))
-
-                # Break if no items left
-                if nestedparameters["limit"] == "0":
-                    break
-
-                # Set offset
-                nestedparameters["offset"] = str(len(cargoquery))
-
-                # Check if auth is needed
-                if BOT_USERNAME and int(parameters.get("limit", "50")) > 500:
-                    nestedparameters["assert"] = "bot"
-                    try:
-                        session = cache.get("session")  # Get session from memcache
-                    except Exception:
-                        session = None
-
-                    # Session may be null from startup or cache expulsion
-                    if not session or not isinstance(session, dict) or "token" not in session:
-                        mw_login()
-                        try:
-                            session = cache.get("session")
-                        except Exception:
-                            session = None
-                        if not session or not isinstance(session, dict):
-                            session = {"token": "", "cookie": None}
-
-                    # Make authorized request
-                    r = requests.get(
-                        url=BASE_URL_API,
-                        params=nestedparameters,
-                        headers={"Authorization": "Bearer " + session.get("token", "")},
-                        cookies=session.get("cookie"),
-                        timeout=10,
-                    )
-                    if "error" in r.json():
-                        # Error may be due to invalid token
-                        # Re-try login
-                        if mw_login():
-                            try:
-                                session = cache.get("session")
-                            except Exception:
-                                session = None
-                            if not isinstance(session, dict):
-                                session = {"token": "", "cookie": None}
-                            r = requests.get(
-                                url=BASE_URL_API,
-                                params=nestedparameters,
-                                headers={"Authorization": "Bearer " + session.get("token", "")},
-                                cookies=session.get("cookie"),
-                                timeout=10,
-                            )
-
-                            # If it errors again, make request without auth:
-                            if "error" in r.json():
-                                del nestedparameters["assert"]
-                                r = requests.get(
-                                    url=BASE_URL_API, params=nestedparameters, timeout=10
-                                )
-                        else:
-                            del nestedparameters["assert"]
-                            r = requests.get(url=BASE_URL_API, params=nestedparameters, timeout=10)
-                else:
-                    r = requests.get(url=BASE_URL_API, params=nestedparameters, timeout=10)
-
-                print("Cargo request: {}".format(r.url))
-                rjson = r.json()
-                raw_responses.append(rjson)
-                cargochunk = rjson["cargoquery"]
-                if len(cargochunk) == 0:  # If nothing was returned, break
-                    break
-
-                cargoquery.extend(cargochunk)
-
-                # If queried items are < limit and there are no warnings, we've received everything:
-                if ("warnings" not in rjson) and (len(cargochunk) < cargolimit):
-                    break
-
-        except:
-            abort(
-                500,
-                description=error_response(
-                    "Error while calling Nookipedia's Cargo API.",
-                    "MediaWiki Cargo request failed for parameters: {}".format(parameters),
+    try:
+        cargoquery = fetch_cargo_pages(parameters, expected_fields)
+    except IncompleteCargoResponse as e:
+        abort(
+            500,
+            description=error_response(
+                "Incomplete data received from Cargo.",
+                "Cargo response missing fields {} after {} attempts for parameters: {}.".format(
+                    e.missing, e.attempts, parameters
                 ),
-            )
-
-        # Check if any expected field is absent
-        all_seen = set()
-        for obj in cargoquery:
-            all_seen.update(k.split(" ")[-1] for k in obj.get("title", {}))
-        missing = [f for f in expected_fields if f not in all_seen]
-        if missing:
-            if attempt < MAX_RETRIES:
-                print(
-                    "Cargo response missing fields {} on attempt {}/{}, retrying...".format(
-                        list(set(missing)), attempt + 1, MAX_RETRIES + 1
-                    )
-                )
-                continue
-            else:
-                abort(
-                    500,
-                    description=error_response(
-                        "Incomplete data received from Cargo.",
-                        "Cargo response missing fields {} after {} attempts for parameters: {}.".format(
-                            list(set(missing)), MAX_RETRIES + 1, parameters
-                        ),
-                    ),
-                )
-        else:
-            missing = []
-        break
+            ),
+        )
+    except:
+        abort(
+            500,
+            description=error_response(
+                "Error while calling Nookipedia's Cargo API.",
+                "MediaWiki Cargo request failed for parameters: {}".format(parameters),
+            ),
+        )
 
     if not cargoquery:
-        try:
-            cache.set(cache_key, json.dumps([]), timeout=43200)
-        except Exception:
-            pass
-        return []
+        store_cargo(cache_key, [], parameters.get("tables", "?"))
+        return [], {}
 
     try:
-        data = []
-
         # Remove duplicate objects to resolve Cargo duplicate issues:
-        results = []
-        for obj in cargoquery:
-            if obj not in results:
-                results.append(obj)
-
-        # Check if user requested specific image size and modify accordingly:
-        for obj in results:
-            item = {}
-
-            # Strip table prefix (e.g. "villager debut" -> "debut") from Cargo field names
-            for key in obj["title"]:
-                item[key.split(" ")[-1]] = obj["title"][key]
+        results = dedupe_rows(cargoquery)
+        del cargoquery
 
+        for item in results:
             row_missing = [f for f in expected_fields if f not in item]
             if row_missing:
-                print(
-                    "Cargo row missing fields {}: {}".format(row_missing, json.dumps(raw_responses))
-                )
-
-            item = deep_unescape(item)
-
-            # Create url to page
-            if "url" in item:
-                item["url"] = "https://nookipedia.com/wiki/" + urllib.parse.quote(item["url"])
-
-            if request.args.get("thumbsize"):
-                # If image, fetch the CDN thumbnail URL:
-                try:
-                    # Only fetch the image if this object actually has an image to fetch
-                    if "image_url" in item:
-                        r = requests.get(
-                            BASE_URL_WIKI
-                            + "Special:FilePath/"
-                            + item["image_url"].rsplit("/", 1)[-1]
-                            + "?width="
-                            + request.args.get("thumbsize"),
-                            timeout=10,
-                        )
-                        item["image_url"] = r.url
-
-                    # If this is a painting that has a fake, fetch that too
-                    if item.get("has_fake", "0") == "1":
-                        r = requests.get(
-                            BASE_URL_WIKI
-                            + "Special:FilePath/"
-                            + item["fake_image_url"].rsplit("/", 1)[-1]
-                            + "?width="
-                            + request.args.get("thumbsize"),
-                            timeout=10,
-                        )
-                        item["fake_image_url"] = r.url
-
-                    # Same goes for the renders
-                    if "render_url" in item:
-                        r = requests.get(
-                            BASE_URL_WIKI
-                            + "Special:FilePath/"
-                            + item["render_url"].rsplit("/", 1)[-1]
-                            + "?width="
-                            + request.args.get("thumbsize"),
-                            timeout=10,
-                        )
-                        item["render_url"] = r.url
-                except:
-                    abort(
-                        500,
-                        description=error_response(
-                            "Error while getting image CDN thumbnail URL.",
-                            "Failure occured with the following parameters: {}.".format(parameters),
-                        ),
-                    )
+                print("Cargo row missing fields {}: {}".format(row_missing, json.dumps(item)))
 
-            data.append(item)
+        # Check if user requested specific image size and modify accordingly:
+        if thumbsize and not apply_thumbnails(results, thumbsize):
+            # Some thumbnails couldn't be resolved: answer with what we have, but don't cache it
+            print("Serving incomplete thumbnails: key={}".format(cache_key))
+            metrics.incr("thumbnails_incomplete")
+            return results, {"X-Thumbnails-Incomplete": "true"}
 
-        if not missing:
-            try:
-                cache.set(cache_key, json.dumps(data), timeout=43200)
-            except Exception:
-                pass
+        store_cargo(cache_key, results, parameters.get("tables", "?"))
 
-        return data
+        return results, {}
     except:
         abort(
             500,
@@ -350,6 +519,19 @@ def call_cargo(parameters, request_args):
         )
 
 
+# With excludedetails=true the list endpoints only return names, so they ask Cargo for just
+# the name columns (cached separately, since the parameters differ) and skip formatting:
+def names_only():
+    return request.args.get("excludedetails") == "true"
+
+
+def project_variation_names(params):
+    # One row per item is enough to know it has a variation matching the filters
+    params["fields"] = project_fields(params["fields"], "name")
+    params["group_by"] = params["fields"].split("=", 1)[0]
+    params["order_by"] = params["group_by"]
+
+
 def get_villager_list(limit, tables, join, fields):
     where = []
 
@@ -495,27 +677,24 @@ def get_critter_list(limit, tables, fields):
                 ),
             )
 
-        paramsNorth = {
-            "action": "cargoquery",
-            "format": "json",
-            "limit": limit,
-            "tables": tables,
-            "fields": fields,
-            "where": "n_m" + calculated_month + '="1"',
-        }
-        paramsSouth = {
+        # Every month is answered from the full table (the same cache entry as the unfiltered
+        # list), filtered here on its n_m<N>/s_m<N> flags instead of a Cargo query per hemisphere
+        params = {
             "action": "cargoquery",
             "format": "json",
             "limit": limit,
             "tables": tables,
             "fields": fields,
-            "where": "s_m" + calculated_month + '="1"',
         }
+        critters = call_cargo(params, request.args)
+        # Formatting mutates rows, and a critter can be in both hemispheres
+        north = [copy.deepcopy(_) for _ in critters if _.get("n_m" + calculated_month) == "1"]
+        south = [copy.deepcopy(_) for _ in critters if _.get("s_m" + calculated_month) == "1"]
 
         # If client doesn't want all details:
         if request.args.get("excludedetails") == "true":
-            n_hemi = months_to_array(call_cargo(paramsNorth, request.args))
-            s_hemi = months_to_array(call_cargo(paramsSouth, request.args))
+            n_hemi = months_to_array(north)
+            s_hemi = months_to_array(south)
 
             if n_hemi and s_hemi:
                 try:
@@ -550,8 +729,8 @@ def get_critter_list(limit, tables, fields):
                 )
         # If client wants full details:
         else:
-            n_hemi = months_to_array(format_critters(call_cargo(paramsNorth, request.args)))
-            s_hemi = months_to_array(format_critters(call_cargo(paramsSouth, request.args)))
+            n_hemi = months_to_array(format_critters(north))
+            s_hemi = months_to_array(format_critters(south))
 
             if n_hemi and s_hemi:
                 try:
@@ -777,6 +956,9 @@ def get_furniture_list(limit, tables, fields):
             )
         where.append('category = "{0}"'.format(category))
 
+    if names_only():
+        fields = project_fields(fields, "name")
+
     params = {
         "action": "cargoquery",
         "format": "json",
@@ -787,6 +969,8 @@ def get_furniture_list(limit, tables, fields):
     params_where(params, where)
 
     cargo_results = call_cargo(params, request.args)
+    if names_only():
+        return cargo_results
     ret = [format_furniture(_) for _ in cargo_results]
     return ret
 
@@ -844,6 +1028,8 @@ def get_furniture_variation_list(limit, tables, fields, orderby):
         "limit": limit,
     }
     params_where(params, where)
+    if names_only():
+        project_variation_names(params)
 
     cargo_results = call_cargo(params, request.args)
     return cargo_results
@@ -930,6 +1116,9 @@ def get_clothing_list(limit, tables, fields):
             )
         )
 
+    if names_only():
+        fields = project_fields(fields, "name")
+
     params = {
         "action": "cargoquery",
         "format": "json",
@@ -940,6 +1129,8 @@ def get_clothing_list(limit, tables, fields):
     params_where(params, where)
 
     cargo_results = call_cargo(params, request.args)
+    if names_only():
+        return cargo_results
     ret = [format_clothing(_) for _ in cargo_results]
     return ret
 
@@ -967,6 +1158,9 @@ def get_gyroid_list(limit, tables, fields):
             )
         where.append('sound = "{0}"'.format(sound))
 
+    if names_only():
+        fields = project_fields(fields, "name")
+
     params = {
         "action": "cargoquery",
         "format": "json",
@@ -977,6 +1171,8 @@ def get_gyroid_list(limit, tables, fields):
     params_where(params, where)
 
     cargo_results = call_cargo(params, request.args)
+    if names_only():
+        return cargo_results
     ret = [format_gyroid(_) for _ in cargo_results]
     return ret
 
@@ -1038,6 +1234,8 @@ def get_variation_list(limit, tables, fields, orderby):
         "limit": limit,
     }
     params_where(params, where)
+    if names_only():
+        project_variation_names(params)
 
     cargo_results = call_cargo(params, request.args)
     return cargo_results
@@ -1059,6 +1257,9 @@ def get_photo_list(limit, tables, fields):
             )
         where.append('category = "{0}"'.format(category))
 
+    if names_only():
+        fields = project_fields(fields, "name")
+
     params = {
         "action": "cargoquery",
         "format": "json",
@@ -1069,6 +1270,8 @@ def get_photo_list(limit, tables, fields):
     params_where(params, where)
 
     cargo_results = call_cargo(params, request.args)
+    if names_only():
+        return cargo_results
     ret = [format_photo(_) for _ in cargo_results]
     return ret
 
@@ -1076,6 +1279,9 @@ def get_photo_list(limit, tables, fields):
 def get_tool_list(limit, tables, fields):
     where = []
 
+    if names_only():
+        fields = project_fields(fields, "name")
+
     params = {
         "action": "cargoquery",
         "format": "json",
@@ -1086,6 +1292,8 @@ def get_tool_list(limit, tables, fields):
     params_where(params, where)
 
     cargo_results = call_cargo(params, request.args)
+    if names_only():
+        return cargo_results
     ret = [format_tool(_) for _ in cargo_results]
     return ret
 
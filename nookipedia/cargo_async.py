@@ -0,0 +1,30 @@
+import asyncio
+
+from nookipedia.cargo import call_cargo
+
+# Views that need several independent Cargo queries run them side by side here, so a
+# cold request costs as much as its slowest query rather than the sum of them all.
+# Each query still goes through call_cargo (and so the shared cache, single-flight and
+# pooled upstream session); it just runs on its own thread of the event loop's executor.
+
+
+async def gather_calls(calls):
+    # asyncio.to_thread copies the caller's context, so Flask's request and g stay usable
+    return await asyncio.gather(*(asyncio.to_thread(call) for call in calls))
+
+
+def run_concurrent(*calls):
+    # Synchronous facade for Flask views: run each zero-argument callable concurrently
+    # and return their results in order. The first exception (e.g. an abort) is re-raised.
+    if len(calls) < 2:
+        return [call() for call in calls]
+    return asyncio.run(gather_calls(calls))
+
+
+def call_cargo_batch(batch, request_args):
+    return run_concurrent(
+        *(
+            lambda parameters=parameters: call_cargo(parameters, request_args)
+            for parameters in batch
+        )
+    )
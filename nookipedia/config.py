@@ -1,6 +1,5 @@
 import configparser
 
-
 config = configparser.ConfigParser()
 config.read("config.ini")
 
@@ -8,10 +7,85 @@ BASE_URL_WIKI = config.get("APP", "BASE_URL_WIKI")
 BASE_URL_API = config.get("APP", "BASE_URL_API")
 BOT_USERNAME = config.get("AUTH", "BOT_USERNAME")
 BOT_PASS = config.get("AUTH", "BOT_PASS")
+# Bot sessions are renewed REFRESH_AHEAD seconds before they expire, and kept on disk across restarts
+BOT_SESSION_TTL = config.getint("AUTH", "SESSION_TTL", fallback=43200)
+BOT_SESSION_REFRESH_AHEAD = config.getint("AUTH", "SESSION_REFRESH_AHEAD", fallback=600)
+BOT_SESSION_FILE = config.get("AUTH", "SESSION_FILE", fallback="mw_session.json")
 DATABASE = config.get("DB", "DATABASE")
 DB_KEYS = config.get("DB", "DB_KEYS")
 DB_ADMIN_KEYS = config.get("DB", "DB_ADMIN_KEYS")
 
+# Outbound HTTP to the wiki (optional section; defaults apply when absent)
+UPSTREAM_POOL_CONNECTIONS = config.getint("UPSTREAM", "POOL_CONNECTIONS", fallback=4)
+UPSTREAM_POOL_MAXSIZE = config.getint("UPSTREAM", "POOL_MAXSIZE", fallback=16)
+UPSTREAM_POOL_BLOCK = config.getboolean("UPSTREAM", "POOL_BLOCK", fallback=False)
+UPSTREAM_TIMEOUT = config.getfloat("UPSTREAM", "TIMEOUT", fallback=10)
+CARGO_PAGE_WORKERS = config.getint("UPSTREAM", "PAGE_WORKERS", fallback=4)
+THUMBNAIL_WORKERS = config.getint("UPSTREAM", "THUMBNAIL_WORKERS", fallback=4)
+# Incomplete Cargo pages are retried up to MAX_RETRIES times each, backing off from RETRY_BACKOFF
+# seconds, with at most RETRY_BUDGET page retries per API request
+CARGO_MAX_RETRIES = config.getint("UPSTREAM", "MAX_RETRIES", fallback=2)
+CARGO_RETRY_BACKOFF = config.getfloat("UPSTREAM", "RETRY_BACKOFF", fallback=0.5)
+CARGO_RETRY_BUDGET = config.getint("UPSTREAM", "RETRY_BUDGET", fallback=6)
+# The breaker opens when at least MIN_CALLS calls in WINDOW seconds fail at FAILURE_RATIO or worse
+BREAKER_WINDOW = config.getint("UPSTREAM", "BREAKER_WINDOW", fallback=60)
+BREAKER_MIN_CALLS = config.getint("UPSTREAM", "BREAKER_MIN_CALLS", fallback=10)
+BREAKER_FAILURE_RATIO = config.getfloat("UPSTREAM", "BREAKER_FAILURE_RATIO", fallback=0.5)
+BREAKER_OPEN_SECONDS = config.getint("UPSTREAM", "BREAKER_OPEN_SECONDS", fallback=30)
+# At most BULKHEAD_WORKER_LIMIT calls per worker and BULKHEAD_FLEET_LIMIT across the fleet are in
+# flight to the wiki; callers queue for up to BULKHEAD_QUEUE_TIMEOUT seconds for a slot
+BULKHEAD_WORKER_LIMIT = config.getint("UPSTREAM", "BULKHEAD_WORKER_LIMIT", fallback=8)
+BULKHEAD_FLEET_LIMIT = config.getint("UPSTREAM", "BULKHEAD_FLEET_LIMIT", fallback=16)
+BULKHEAD_QUEUE_TIMEOUT = config.getfloat("UPSTREAM", "BULKHEAD_QUEUE_TIMEOUT", fallback=10)
+BULKHEAD_POLL = config.getfloat("UPSTREAM", "BULKHEAD_POLL", fallback=0.05)
+BULKHEAD_SLOT_TTL = config.getint("UPSTREAM", "BULKHEAD_SLOT_TTL", fallback=60)
+# Each API request stops calling the wiki REQUEST_DEADLINE seconds after it starts; the optional
+# [DEADLINES] section overrides this per endpoint (e.g. furniture.get_nh_furniture_all = 40)
+REQUEST_DEADLINE = config.getfloat("UPSTREAM", "REQUEST_DEADLINE", fallback=25)
+ENDPOINT_DEADLINES = (
+    {endpoint: float(seconds) for endpoint, seconds in config.items("DEADLINES")}
+    if config.has_section("DEADLINES")
+    else {}
+)
+
+# Cargo results are refreshed in the background after SOFT_TTL and dropped after HARD_TTL (seconds)
+CARGO_SOFT_TTL = config.getint("CACHE", "SOFT_TTL", fallback=43200)
+CARGO_HARD_TTL = config.getint("CACHE", "HARD_TTL", fallback=172800)
+CARGO_REFRESH_WORKERS = config.getint("CACHE", "REFRESH_WORKERS", fallback=2)
+# Row counts are re-discovered this often (seconds); limits.ini stays the ceiling
+CARGO_COUNT_TTL = config.getint("CACHE", "COUNT_TTL", fallback=3600)
+# How long a request waits on another thread's identical Cargo fetch before doing its own
+CARGO_FLIGHT_TIMEOUT = config.getfloat("CACHE", "FLIGHT_TIMEOUT", fallback=30)
+# Cross-worker regeneration leases: how long one is held, and how long losers poll for the result
+CARGO_LEASE_TTL = config.getint("CACHE", "LEASE_TTL", fallback=60)
+CARGO_LEASE_WAIT = config.getfloat("CACHE", "LEASE_WAIT", fallback=5)
+CARGO_LEASE_POLL = config.getfloat("CACHE", "LEASE_POLL", fallback=0.1)
+# Last good copies of Cargo results are kept this long (seconds), served while another worker
+# refreshes the key or when Cargo is failing
+CARGO_STALE_TTL = config.getint("CACHE", "STALE_TTL", fallback=604800)
+# Cached values of at least COMPRESS_THRESHOLD bytes are zlib-compressed at COMPRESS_LEVEL (1-9)
+CACHE_COMPRESS_THRESHOLD = config.getint("CACHE", "COMPRESS_THRESHOLD", fallback=1024)
+CACHE_COMPRESS_LEVEL = config.getint("CACHE", "COMPRESS_LEVEL", fallback=6)
+# Packed values bigger than CHUNK_SIZE bytes are split across several memcached items; keep it
+# below memcached's item size limit (-I, 1 MB by default) minus some room for the key
+CACHE_CHUNK_SIZE = config.getint("CACHE", "CHUNK_SIZE", fallback=1000000)
+# Each worker keeps up to LOCAL_MAX_BYTES of recently read values in memory for LOCAL_TTL seconds
+CACHE_LOCAL_MAX_BYTES = config.getint("CACHE", "LOCAL_MAX_BYTES", fallback=33554432)
+CACHE_LOCAL_TTL = config.getfloat("CACHE", "LOCAL_TTL", fallback=10)
+# Cargo entries are serialized with CODEC: pickle, json, or msgpack (if installed). Keep json
+# while rolling out to workers that predate codecs, since only json entries are readable by them
+CACHE_CODEC = config.get("CACHE", "CODEC", fallback="pickle")
+# Finished API responses are cached for RESPONSE_TTL seconds (0 turns the response cache off)
+RESPONSE_CACHE_TTL = config.getint("CACHE", "RESPONSE_TTL", fallback=600)
+# Resolved thumbnail URLs are kept for THUMBNAIL_TTL seconds. Requested widths snap up to the
+# nearest of THUMBNAIL_WIDTH_BUCKETS (comma-separated; empty keeps the exact width)
+THUMBNAIL_TTL = config.getint("CACHE", "THUMBNAIL_TTL", fallback=2592000)
+THUMBNAIL_WIDTH_BUCKETS = sorted(
+    int(width)
+    for width in config.get("CACHE", "THUMBNAIL_WIDTH_BUCKETS", fallback="").split(",")
+    if width.strip()
+)
+
 limits = configparser.ConfigParser()
 limits.read("limits.ini")
 
@@ -0,0 +1,36 @@
+import os
+import threading
+
+# In-process counters and timings for this worker; each uWSGI worker reports its own.
+lock = threading.Lock()
+counters = {}
+timings = {}
+
+
+def incr(name, amount=1):
+    with lock:
+        counters[name] = counters.get(name, 0) + amount
+
+
+def observe(name, seconds):
+    with lock:
+        timing = timings.setdefault(name, {"count": 0, "total": 0.0, "max": 0.0})
+        timing["count"] += 1
+        timing["total"] += seconds
+        timing["max"] = max(timing["max"], seconds)
+
+
+def snapshot():
+    with lock:
+        return {
+            "pid": os.getpid(),
+            "counters": dict(counters),
+            "timings": {
+                name: {
+                    "count": timing["count"],
+                    "mean": timing["total"] / timing["count"],
+                    "max": timing["max"],
+                }
+                for name, timing in timings.items()
+            },
+        }
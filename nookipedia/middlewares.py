@@ -1,4 +1,11 @@
-from flask import abort
+import functools
+import hashlib
+from datetime import date
+
+from flask import abort, current_app, g, request as current_request
+from nookipedia import metrics
+from nookipedia.cache import get_value, pack_value, set_generation, set_packed
+from nookipedia.config import RESPONSE_CACHE_TTL
 from nookipedia.errors import error_response
 from nookipedia.db import query_db
 
@@ -36,3 +43,58 @@ def authorize(db, request):
                 "UUID is either missing or invalid; or, unspecified server occured.",
             ),
         )
+
+
+# Headers that mark a response as degraded; those are served but never cached
+DEGRADED_HEADERS = ("X-Stale-Data", "X-Thumbnails-Incomplete")
+
+
+# Cache the encoded body of successful responses, so a hit skips the Cargo lookup, formatting
+# and serialization entirely. Hits are still authorized against `db`:
+def cache_response(db):
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            if RESPONSE_CACHE_TTL <= 0:
+                return view(*args, **kwargs)
+
+            key = response_cache_key()
+            try:
+                body = get_value(key, "response")
+            except Exception:
+                body = None
+            if body is not None:
+                authorize(db, current_request)
+                metrics.incr("response_cache_hits")
+                return current_app.response_class(body, mimetype="application/json")
+
+            metrics.incr("response_cache_misses")
+            response = current_app.make_response(view(*args, **kwargs))
+            degraded = any(header in g.get("response_headers", {}) for header in DEGRADED_HEADERS)
+            if (
+                response.status_code == 200
+                and response.mimetype == "application/json"
+                and not degraded
+            ):
+                body = response.get_data()
+                try:
+                    set_packed(key, pack_value(body, "response"), RESPONSE_CACHE_TTL)
+                    set_generation(key, body, RESPONSE_CACHE_TTL)
+                except Exception:
+                    pass
+            return response
+
+        return wrapper
+
+    return decorator
+
+
+def response_cache_key():
+    # Path, query args without the API key, and Accept-Version. Today's date is included because
+    # some filters are relative (month=current, date=today)
+    args = sorted(
+        (name, value) for name, value in current_request.args.items(multi=True) if name != "api_key"
+    )
+    version = current_request.headers.get("Accept-Version", "latest").strip()
+    key = "{}|{}|{}|{}".format(current_request.path, args, version, date.today().isoformat())
+    return "response:" + hashlib.md5(key.encode()).hexdigest()
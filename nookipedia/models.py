@@ -590,6 +590,12 @@ def stitch_variation_list(items, variations):
     return processed
 
 
+def stitch_variation_names(items, variations):
+    # Names-only counterpart of stitch_variation_list, for rows holding just the name
+    with_variations = {_["name"] for _ in variations}
+    return [name for name in dict.fromkeys(_["name"] for _ in items) if name in with_variations]
+
+
 def stitch_variation(item, variations):
     item["variations"] = []
     for variation in variations:
@@ -0,0 +1,80 @@
+import json
+import pickle
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None  # Optional; install it to use CODEC = msgpack
+
+from nookipedia.config import CACHE_CODEC
+
+# Cached Cargo entries start with a header naming how they were written: a magic byte, the header
+# version, then the codec id. Entries without a header are plain JSON and are still read, so
+# workers can be rolled over while the cache holds both. With CODEC = json, entries are written
+# without a header too, so workers from before codecs existed can read them during a rollout.
+HEADER_MAGIC = b"N"
+HEADER_VERSION = b"1"
+
+
+class JsonCodec:
+    id = b"j"
+
+    @staticmethod
+    def encode(obj):
+        return json.dumps(obj, separators=(",", ":")).encode()
+
+    @staticmethod
+    def decode(data):
+        return json.loads(data)
+
+
+class PickleCodec:
+    # Only ever reads what this API wrote to its own memcached
+    id = b"p"
+
+    @staticmethod
+    def encode(obj):
+        return pickle.dumps(obj, protocol=pickle.HIGHEST_PROTOCOL)
+
+    @staticmethod
+    def decode(data):
+        return pickle.loads(data)
+
+
+class MsgpackCodec:
+    id = b"m"
+
+    @staticmethod
+    def encode(obj):
+        return msgpack.packb(obj, use_bin_type=True)
+
+    @staticmethod
+    def decode(data):
+        return msgpack.unpackb(data, raw=False)
+
+
+CODECS = {"json": JsonCodec, "pickle": PickleCodec}
+if msgpack is not None:
+    CODECS["msgpack"] = MsgpackCodec
+CODECS_BY_ID = {codec.id: codec for codec in CODECS.values()}
+
+if CACHE_CODEC not in CODECS:
+    print("Cache codec {} is not available; using pickle.".format(CACHE_CODEC))
+codec = CODECS.get(CACHE_CODEC, PickleCodec)
+
+
+def encode_entry(obj):
+    if codec is JsonCodec:
+        return codec.encode(obj)
+    return HEADER_MAGIC + HEADER_VERSION + codec.id + codec.encode(obj)
+
+
+def decode_entry(data):
+    if isinstance(data, str):
+        return json.loads(data)
+    if data[:1] != HEADER_MAGIC:
+        return json.loads(data)  # Plain JSON: CODEC = json, or written before codecs existed
+    if data[1:2] != HEADER_VERSION or data[2:3] not in CODECS_BY_ID:
+        # From a newer worker, or a codec this worker lacks (e.g. msgpack isn't installed)
+        raise ValueError("Cannot decode cache entry with header {!r}".format(data[:3]))
+    return CODECS_BY_ID[data[2:3]].decode(data[3:])
@@ -0,0 +1,91 @@
+import copy
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+
+class Flight:
+    # One in-progress call that other threads can wait on.
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    # Coalesce concurrent calls for the same key within this process.
+    # The first caller runs the function; the rest wait for its result (or its error).
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.flights = {}
+
+    def do(self, key, fn, timeout):
+        with self.lock:
+            flight = self.flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self.flights[key] = Flight()
+            else:
+                flight.waiters += 1
+
+        if not leader:
+            if flight.done.wait(timeout):
+                if flight.error is not None:
+                    raise flight.error
+                # Callers format results in place, so every waiter gets its own copy of the
+                # leader's untouched one
+                return copy.deepcopy(flight.result)
+            # The leader is taking too long; don't hold this request hostage
+            print("Single-flight wait timed out: key={}".format(key))
+            return fn()
+
+        try:
+            result = fn()
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with self.lock:
+                del self.flights[key]
+                waiters = flight.waiters
+            # The leader formats its result in place as soon as we return, so waiters copy from a
+            # snapshot taken before they are woken. Once the flight is unlisted no more can join.
+            if flight.error is None and waiters:
+                flight.result = copy.deepcopy(result)
+            flight.done.set()
+        return result
+
+
+class Refresher:
+    # Run refreshes on a small background pool, at most one per key at a time.
+
+    def __init__(self, max_workers):
+        self.max_workers = max_workers
+        self.lock = threading.Lock()
+        self.pending = set()
+        self.executor = None
+        self.pid = None
+
+    def submit(self, key, fn):
+        with self.lock:
+            if key in self.pending:
+                return False
+            # Threads don't survive fork(), so each worker starts its own pool
+            if self.executor is None or self.pid != os.getpid():
+                self.executor = ThreadPoolExecutor(max_workers=self.max_workers)
+                self.pid = os.getpid()
+            self.pending.add(key)
+        self.executor.submit(self.run, key, fn)
+        return True
+
+    def run(self, key, fn):
+        try:
+            fn()
+        except Exception as e:
+            print("Background refresh failed: key={} error={!r}".format(key, e))
+        finally:
+            with self.lock:
+                self.pending.discard(key)
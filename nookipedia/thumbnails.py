@@ -0,0 +1,134 @@
+import hashlib
+import urllib.parse
+
+from nookipedia import metrics, upstream
+from nookipedia.cache import cache
+from nookipedia.config import (
+    BASE_URL_API,
+    THUMBNAIL_TTL,
+    THUMBNAIL_WIDTH_BUCKETS,
+    THUMBNAIL_WORKERS,
+)
+
+# Image fields in Cargo rows that get swapped for thumbnails when a client passes thumbsize
+THUMBNAIL_FIELDS = ("image_url", "fake_image_url", "render_url")
+# Titles per imageinfo query (MediaWiki's cap for non-bot accounts)
+BATCH_SIZE = 50
+
+
+def thumbnail_width(width):
+    # Snap a requested width up to the nearest configured bucket, so more requests share entries
+    if not width or not width.isdigit():
+        return width
+    for bucket in THUMBNAIL_WIDTH_BUCKETS:
+        if bucket >= int(width):
+            return str(bucket)
+    return width
+
+
+def thumbnail_key(file, width):
+    return "thumb:{}:{}".format(width, hashlib.md5(file.encode()).hexdigest())
+
+
+def image_files(item):
+    # Fields of a row that have an image to resize, with the file name of each
+    files = {}
+    for field in THUMBNAIL_FIELDS:
+        # Paintings only have a fake image worth resizing if they actually have a fake
+        if field == "fake_image_url" and item.get("has_fake", "0") != "1":
+            continue
+        if item.get(field):
+            files[field] = item[field].rsplit("/", 1)[-1]
+    return files
+
+
+def apply_thumbnails(rows, width):
+    # Replace the image URLs of every row with thumbnails `width` pixels wide, resolving all of
+    # them through a few batched imageinfo queries instead of a request per image.
+    # Returns False if some batches failed; those rows keep their full-size URLs
+    width = thumbnail_width(width)
+    row_files = [image_files(item) for item in rows]
+    thumbnails, complete = resolve_thumbnails(
+        [file for files in row_files for file in files.values()], width
+    )
+    for item, files in zip(rows, row_files):
+        for field, file in files.items():
+            if file in thumbnails:
+                item[field] = thumbnails[file]
+    return complete
+
+
+def resolve_thumbnails(files, width):
+    # Map each file name to its thumbnail URL, and say whether every batch was answered;
+    # files the wiki doesn't know are left out.
+    # Thumbnails are cached per file and width, so they're shared by every table and filter
+    files = list(dict.fromkeys(files))
+    if not files:
+        return {}, True
+    try:
+        cached = cache.get_many(*[thumbnail_key(file, width) for file in files])
+    except Exception:
+        cached = [None] * len(files)
+    thumbnails = {file: url for file, url in zip(files, cached) if url is not None}
+    missing = [file for file in files if file not in thumbnails]
+    metrics.incr("thumbnail_cache_hits", len(thumbnails))
+    metrics.incr("thumbnail_cache_misses", len(missing))
+    if not missing:
+        return thumbnails, True
+
+    batches = [missing[i : i + BATCH_SIZE] for i in range(0, len(missing), BATCH_SIZE)]
+    found = {}
+    complete = True
+    for batch_found in upstream.map_concurrent(
+        lambda batch: try_thumbnail_batch(batch, width), batches, THUMBNAIL_WORKERS
+    ):
+        if batch_found is None:
+            complete = False
+        else:
+            found.update(batch_found)
+    try:
+        cache.set_many(
+            {thumbnail_key(file, width): url for file, url in found.items()},
+            timeout=THUMBNAIL_TTL,
+        )
+    except Exception:
+        pass
+    thumbnails.update(found)
+    return thumbnails, complete
+
+
+def try_thumbnail_batch(files, width):
+    # A failed batch only costs its own thumbnails, not the whole response
+    try:
+        return fetch_thumbnail_batch(files, width)
+    except Exception as e:
+        print("Thumbnail batch of {} files failed: {}".format(len(files), e))
+        metrics.incr("thumbnail_batch_failures")
+        return None
+
+
+def fetch_thumbnail_batch(files, width):
+    titles = {"File:" + urllib.parse.unquote(file): file for file in files}
+    params = {
+        "action": "query",
+        "format": "json",
+        "prop": "imageinfo",
+        "iiprop": "url",
+        "iiurlwidth": width,
+        "titles": "|".join(titles),
+    }
+    r = upstream.get(url=BASE_URL_API, params=params)
+    print("Thumbnail request: {}".format(r.url))
+    query = r.json()["query"]
+
+    # MediaWiki answers with normalized titles (e.g. underscores become spaces); map them back
+    for normalized in query.get("normalized", []):
+        if normalized["from"] in titles:
+            titles[normalized["to"]] = titles[normalized["from"]]
+
+    found = {}
+    for page in query.get("pages", {}).values():
+        info = page.get("imageinfo")
+        if page.get("title") in titles and info:
+            found[titles[page["title"]]] = info[0].get("thumburl") or info[0]["url"]
+    return found
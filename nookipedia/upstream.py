@@ -0,0 +1,360 @@
+import contextvars
+import heapq
+import itertools
+import os
+import random
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from http.cookiejar import DefaultCookiePolicy
+
+import requests
+from flask import g, has_app_context
+from requests.adapters import HTTPAdapter
+
+from nookipedia import metrics
+from nookipedia.cache import mc_client
+from nookipedia.config import (
+    BREAKER_FAILURE_RATIO,
+    BREAKER_MIN_CALLS,
+    BREAKER_OPEN_SECONDS,
+    BREAKER_WINDOW,
+    BULKHEAD_FLEET_LIMIT,
+    BULKHEAD_POLL,
+    BULKHEAD_QUEUE_TIMEOUT,
+    BULKHEAD_SLOT_TTL,
+    BULKHEAD_WORKER_LIMIT,
+    UPSTREAM_POOL_BLOCK,
+    UPSTREAM_POOL_CONNECTIONS,
+    UPSTREAM_POOL_MAXSIZE,
+    UPSTREAM_TIMEOUT,
+)
+
+
+class SessionPool:
+    # One pooled keep-alive requests.Session per worker process, shared by its threads.
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.session = None
+        self.pid = None
+
+    def get(self):
+        # A session inherited across fork() would share sockets with the parent
+        if self.session is None or self.pid != os.getpid():
+            with self.lock:
+                if self.session is None or self.pid != os.getpid():
+                    self.session = build_session()
+                    self.pid = os.getpid()
+        return self.session
+
+    def reset(self):
+        # Drop pooled connections (called after uWSGI forks a worker).
+        with self.lock:
+            if self.session is not None:
+                try:
+                    self.session.close()
+                except Exception:
+                    pass
+            self.session = None
+            self.pid = None
+
+
+def build_session():
+    session = requests.Session()
+    # The session is shared by every thread in the worker, so never let cookies
+    # (e.g. the bot login) leak from one call into another; callers pass them explicitly
+    session.cookies.set_policy(DefaultCookiePolicy(allowed_domains=[]))
+    # Cargo pages are large, repetitive JSON; always ask for them compressed
+    session.headers["Accept-Encoding"] = "gzip, deflate"
+    # pool_connections is the number of hosts kept in the pool,
+    # pool_maxsize is the number of keep-alive connections kept per host
+    adapter = HTTPAdapter(
+        pool_connections=UPSTREAM_POOL_CONNECTIONS,
+        pool_maxsize=UPSTREAM_POOL_MAXSIZE,
+        pool_block=UPSTREAM_POOL_BLOCK,
+    )
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+class CircuitOpen(requests.exceptions.RequestException):
+    # Raised instead of calling the wiki while the circuit breaker is open.
+    pass
+
+
+class CircuitBreaker:
+    # Shared by every uWSGI worker through memcached:
+    # closed    -> open when too many calls in the window fail or time out,
+    # open      -> half-open after BREAKER_OPEN_SECONDS, letting a single probe through,
+    # half-open -> closed if the probe succeeds, open again if it fails.
+    # If memcached itself is unreachable the breaker stays closed.
+
+    def __init__(self, name):
+        self.prefix = "breaker:" + name + ":"
+
+    def status(self):
+        try:
+            values = mc_client.get_multi(["open", "tripped", "calls", "failures"], self.prefix)
+        except Exception:
+            values = {}
+        if values.get("open"):
+            state = "open"
+        elif values.get("tripped"):
+            state = "half-open"
+        else:
+            state = "closed"
+        return {
+            "state": state,
+            "opened_at": values.get("open") or values.get("tripped"),
+            "calls": values.get("calls", 0),
+            "failures": values.get("failures", 0),
+        }
+
+    def before_call(self):
+        try:
+            values = mc_client.get_multi(["open", "tripped"], self.prefix)
+            if values.get("open"):
+                raise CircuitOpen("Circuit breaker is open; not calling the wiki.")
+            if values.get("tripped"):
+                # Half-open: only one caller across the fleet gets to probe
+                if not mc_client.add(self.prefix + "probe", 1, time=BREAKER_OPEN_SECONDS):
+                    raise CircuitOpen("Circuit breaker is half-open; a probe is in flight.")
+                return "half-open"
+        except CircuitOpen:
+            metrics.incr("breaker_rejected")
+            raise
+        except Exception:
+            pass
+        return "closed"
+
+    def record(self, state, ok):
+        try:
+            if state == "half-open":
+                if ok:
+                    self.close()
+                else:
+                    self.trip()
+                return
+
+            mc_client.add(self.prefix + "calls", 0, time=BREAKER_WINDOW)
+            mc_client.add(self.prefix + "failures", 0, time=BREAKER_WINDOW)
+            calls = mc_client.incr(self.prefix + "calls")
+            failures = mc_client.incr(self.prefix + "failures") if not ok else None
+            if failures is not None and calls >= BREAKER_MIN_CALLS:
+                if failures / calls >= BREAKER_FAILURE_RATIO:
+                    self.trip()
+        except Exception:
+            pass
+
+    def trip(self):
+        print("Circuit breaker opened: {}".format(self.prefix))
+        metrics.incr("breaker_opened")
+        now = int(time.time())
+        mc_client.set(self.prefix + "open", now, time=BREAKER_OPEN_SECONDS)
+        mc_client.set(self.prefix + "tripped", now)
+        mc_client.delete_multi(["calls", "failures", "probe"], key_prefix=self.prefix)
+
+    def close(self):
+        print("Circuit breaker closed: {}".format(self.prefix))
+        metrics.incr("breaker_closed")
+        mc_client.delete_multi(["open", "tripped", "probe"], key_prefix=self.prefix)
+
+
+# Lower runs first: lookups of a single item jump ahead of bulk list pulls and background refreshes
+PRIORITY_ITEM = 0
+PRIORITY_BULK = 1
+PRIORITY_NAMES = {PRIORITY_ITEM: "item", PRIORITY_BULK: "bulk"}
+
+
+class BulkheadFull(requests.exceptions.RequestException):
+    # Raised when a call waited too long for a free slot to the wiki.
+    pass
+
+
+class Bulkhead:
+    # Caps the calls in flight to the wiki, so a burst of distinct queries queues here
+    # instead of getting us throttled:
+    # per worker, at most worker_limit threads call out at once; the rest wait in
+    # priority order, then arrival order;
+    # per fleet, each call also holds one of fleet_limit slots in memcached. Slots expire
+    # on their own, so a worker that dies holding one can't leak it for long; each holds
+    # a token so a call that outlives its slot doesn't free one someone else has since taken.
+    # If memcached itself is unreachable only the per-worker limit applies.
+
+    def __init__(self, name, worker_limit, fleet_limit):
+        self.prefix = "bulkhead:" + name + ":"
+        self.worker_limit = worker_limit
+        self.slots = [str(i) for i in range(fleet_limit)]
+        self.condition = threading.Condition()
+        self.in_use = 0
+        self.queue = []  # Heap of (priority, arrival) tickets
+        self.arrivals = itertools.count()
+
+    def status(self):
+        with self.condition:
+            worker = {"in_use": self.in_use, "queued": len(self.queue)}
+        try:
+            fleet = len(mc_client.get_multi(self.slots, self.prefix))
+        except Exception:
+            fleet = None
+        return {"worker": worker, "fleet_in_use": fleet}
+
+    def acquire(self, priority, timeout):
+        started = time.monotonic()
+        deadline = started + timeout
+        self.acquire_worker(priority, deadline)
+        try:
+            slot = self.acquire_fleet(priority, deadline)
+        except BaseException:
+            self.release_worker()
+            raise
+        metrics.observe(
+            "bulkhead_queue_seconds_" + PRIORITY_NAMES[priority], time.monotonic() - started
+        )
+        return slot
+
+    def release(self, slot):
+        if slot is not None:
+            slot, token = slot
+            try:
+                if mc_client.get(self.prefix + slot) == token:
+                    mc_client.delete(self.prefix + slot)
+            except Exception:
+                pass
+        self.release_worker()
+
+    def acquire_worker(self, priority, deadline):
+        with self.condition:
+            ticket = (priority, next(self.arrivals))
+            heapq.heappush(self.queue, ticket)
+            try:
+                while self.in_use >= self.worker_limit or self.queue[0] != ticket:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self.reject(priority)
+                    self.condition.wait(remaining)
+                self.in_use += 1
+            finally:
+                self.queue.remove(ticket)
+                heapq.heapify(self.queue)
+                # The next ticket in line may be able to go now
+                self.condition.notify_all()
+
+    def release_worker(self):
+        with self.condition:
+            self.in_use -= 1
+            self.condition.notify_all()
+
+    def acquire_fleet(self, priority, deadline):
+        if not self.slots:
+            return None
+        while True:
+            try:
+                taken = mc_client.get_multi(self.slots, self.prefix)
+                free = [slot for slot in self.slots if slot not in taken]
+                random.shuffle(free)  # Don't have every worker race for the same slot
+                token = uuid.uuid4().hex
+                for slot in free:
+                    if mc_client.add(self.prefix + slot, token, time=BULKHEAD_SLOT_TTL):
+                        return slot, token
+            except Exception:
+                return None
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                self.reject(priority)
+            # Bulk pulls poll less eagerly, so single-item lookups tend to win freed slots
+            poll = BULKHEAD_POLL if priority == PRIORITY_ITEM else BULKHEAD_POLL * 4
+            time.sleep(min(poll, remaining))
+
+    def reject(self, priority):
+        metrics.incr("bulkhead_rejected_" + PRIORITY_NAMES[priority])
+        raise BulkheadFull("Timed out waiting for a free slot to the wiki.")
+
+
+sessions = SessionPool()
+breaker = CircuitBreaker("wiki")
+bulkhead = Bulkhead("wiki", BULKHEAD_WORKER_LIMIT, BULKHEAD_FLEET_LIMIT)
+
+
+def current_priority():
+    # Set per API request in before_request; anything outside a request (e.g. refreshes) is bulk
+    if has_app_context():
+        return g.get("upstream_priority", PRIORITY_BULK)
+    return PRIORITY_BULK
+
+
+class DeadlineExceeded(requests.exceptions.RequestException):
+    # Raised instead of calling the wiki once the API request's deadline has passed.
+    pass
+
+
+def time_left():
+    # Seconds until this API request's deadline (set in before_request), or None if it has none
+    if has_app_context() and "deadline" in g:
+        return g.deadline - time.monotonic()
+    return None
+
+
+def within_deadline(seconds):
+    # Shorten a wait so it ends by the API request's deadline
+    left = time_left()
+    if left is None:
+        return seconds
+    return max(min(seconds, left), 0)
+
+
+def check_deadline():
+    left = time_left()
+    if left is not None and left <= 0:
+        metrics.incr("deadline_exceeded")
+        raise DeadlineExceeded("Request deadline passed; not calling the wiki.")
+    return left
+
+
+def request(method, url, **kwargs):
+    timeout = kwargs.get("timeout", UPSTREAM_TIMEOUT)
+    check_deadline()
+    state = breaker.before_call()
+    slot = bulkhead.acquire(current_priority(), within_deadline(BULKHEAD_QUEUE_TIMEOUT))
+    shortened = False
+    try:
+        # Never wait on the wiki past the deadline, including time spent queued in the bulkhead
+        left = check_deadline()
+        if left is not None and left < timeout:
+            timeout, shortened = left, True
+        kwargs["timeout"] = timeout
+        r = sessions.get().request(method, url, **kwargs)
+    except DeadlineExceeded:
+        raise
+    except requests.exceptions.RequestException as e:
+        # Timing out on our own shortened budget says nothing about the wiki's health
+        if not (shortened and isinstance(e, requests.exceptions.Timeout)):
+            breaker.record(state, False)
+        raise
+    finally:
+        bulkhead.release(slot)
+    # Throttling and server errors count against the wiki; anything else means it's up
+    breaker.record(state, r.status_code < 500 and r.status_code != 429)
+    return r
+
+
+def get(url, **kwargs):
+    return request("GET", url, **kwargs)
+
+
+def post(url, **kwargs):
+    return request("POST", url, **kwargs)
+
+
+def map_concurrent(fn, items, max_workers):
+    # Call fn on every item from a bounded thread pool and return the results in order.
+    # Each call runs in a copy of the caller's context, so Flask's request and g stay usable.
+    items = list(items)
+    if not items:
+        return []
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(items))) as executor:
+        futures = [executor.submit(contextvars.copy_context().run, fn, item) for item in items]
+        return [future.result() for future in futures]
@@ -1,7 +1,8 @@
 import html
+import json
 import re
 from datetime import datetime
-from flask import abort, request
+from flask import abort, g, request
 
 from nookipedia.errors import error_response
 
@@ -18,6 +19,19 @@ def deep_unescape(data):
         return data
 
 
+# Drop repeated rows, keeping the first of each in order. Rows are compared by a canonical
+# fingerprint in a set rather than by scanning the kept rows, which was quadratic:
+def dedupe_rows(rows):
+    seen = set()
+    results = []
+    for row in rows:
+        fingerprint = json.dumps(row, sort_keys=True)
+        if fingerprint not in seen:
+            seen.add(fingerprint)
+            results.append(row)
+    return results
+
+
 # Convert month query parameter input into integer:
 # Acceptable input: 'current', '1', '01', 'jan', 'january'
 def month_to_int(month):
@@ -244,3 +258,19 @@ def params_where(params, where):
 
 def generate_fields(*fields):
     return ",".join(fields)
+
+
+def project_fields(fields, *names):
+    """Narrows a `generate_fields` string to the fields named in the response;\n
+    `names` are output names (`en_name=name` is kept for `name`)\n
+    Falls back to all of `fields` if none of them match"""
+    kept = [field for field in fields.split(",") if field.split("=", 1)[-1].strip() in names]
+    return ",".join(kept) if kept else fields
+
+
+def add_response_header(name, value):
+    """Attach a header to the response of the current request;\n
+    applied by the app's `after_request` hook"""
+    if "response_headers" not in g:
+        g.response_headers = {}
+    g.response_headers[name] = value